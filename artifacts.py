@@ -0,0 +1,305 @@
+"""
+# Content addressed storage for compiled units.
+
+# Artifacts are files stored in the &namespace of the &cache root and identified by a
+# &key derived from the fingerprint of the unit's source and the parameters that
+# influence the compiler's output. Stored artifacts are materialized by reflink
+# when supported, by hardlink otherwise, and copied as a last resort.
+
+# &write replaces build outputs atomically and leaves outputs whose content did not
+# change untouched so that their modification times do not trigger dependent work.
+# &replicate mirrors directories of artifacts using the same methods as materialization.
+
+# [ Properties ]
+# /namespace/
+	# The &cache namespace holding the artifacts.
+# /limit/
+	# The maximum number of bytes used by the artifacts.
+# /prune_frequency/
+	# The number of stores between the pruning of the namespace.
+"""
+import os
+import time
+import shutil
+import hashlib
+import functools
+import concurrent.futures
+import importlib.util
+
+from . import cache
+from . import fingerprint
+
+namespace = 'units'
+limit = 1024 * 1024 * 1024
+prune_frequency = 64
+
+# Linux ioctl(2) request cloning the extents of a file.
+_FICLONE = 0x40049409
+_stores = 0
+
+# Modules whose implementation determines the produced units.
+_implementation = ('module.py', 'instrumentation.py', 'source.py', 'bytecode.py', 'bin/compile.py')
+
+@functools.lru_cache(1)
+def version() -> str:
+	"""
+	# Identify the version of the compiler implementation using the digest of its modules.
+	"""
+	h = hashlib.sha256()
+	directory = os.path.dirname(__file__)
+
+	for x in _implementation:
+		try:
+			with open(os.path.join(directory, x), 'rb') as f:
+				h.update(f.read())
+		except OSError:
+			h.update(x.encode('utf-8'))
+
+	return h.hexdigest()
+
+def key(fingerprint:str, kind:str, path:str, encoding:str, factor, intention, optimize) -> str:
+	"""
+	# Construct the key of the &kind of artifact produced from the source identified by &fingerprint.
+
+	# The &path of the source is included as it is recorded in the compiled code, and
+	# the &encoding as it determines the text that the source file is read as.
+	"""
+	fields = (
+		fingerprint, kind, str(path), str(encoding), str(factor), str(intention), str(optimize),
+		importlib.util.MAGIC_NUMBER.hex(), version(),
+	)
+	return hashlib.sha256('\x00'.join(fields).encode('utf-8')).hexdigest()
+
+def _reflink(origin, target):
+	import fcntl
+
+	with open(origin, 'rb') as src, open(target, 'wb') as dst:
+		try:
+			fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+		except OSError:
+			os.unlink(target)
+			raise
+
+def _copy_range(origin, target):
+	with open(origin, 'rb') as src, open(target, 'wb') as dst:
+		try:
+			size = os.fstat(src.fileno()).st_size
+			while size > 0:
+				n = os.copy_file_range(src.fileno(), dst.fileno(), size)
+				if n == 0:
+					break
+				size -= n
+		except OSError:
+			os.unlink(target)
+			raise
+
+def _clone(origin, target, link=False):
+	# Reflink, hardlink when &link is permitted, or copy &origin to &target.
+	try:
+		return _reflink(origin, target)
+	except (OSError, ImportError):
+		pass
+
+	if link:
+		try:
+			return os.link(origin, target)
+		except OSError:
+			pass
+
+	try:
+		return _copy_range(origin, target)
+	except (OSError, AttributeError):
+		pass
+
+	shutil.copyfile(origin, target)
+
+def identical(path:str, data:bytes) -> bool:
+	"""
+	# Whether the file at &path holds &data.
+	"""
+	try:
+		st = os.stat(path)
+	except OSError:
+		return False
+
+	if st.st_size != len(data):
+		return False
+
+	h = hashlib.new(fingerprint.algorithm, data)
+	return fingerprint.digest(path) == h.hexdigest()
+
+def write(target:str, data:bytes) -> bool:
+	"""
+	# Write &data to &target through a temporary file renamed into place.
+	# Returns &False when &target held identical data and was left unmodified.
+	"""
+	target = str(target)
+	if identical(target, data):
+		return False
+
+	tmp = target + '.' + str(os.getpid())
+	try:
+		with open(tmp, 'wb') as f:
+			f.write(data)
+		os.replace(tmp, target)
+	except BaseException:
+		try:
+			os.unlink(tmp)
+		except OSError:
+			pass
+		raise
+
+	return True
+
+def materialize(key:str, target:str) -> bool:
+	"""
+	# Replace &target with the artifact identified by &key.
+	# Returns &False when the artifact is not present.
+
+	# Only the access time of the entry is updated for &cache.prune as the entry
+	# may be linked to targets whose modification times must not change.
+	"""
+	entry = cache.path(namespace, key)
+	tmp = target + '.' + str(os.getpid())
+
+	try:
+		linked = os.path.samefile(entry, target)
+	except OSError:
+		linked = False
+
+	if not linked:
+		try:
+			_clone(entry, tmp, link=True)
+			os.replace(tmp, target)
+		except OSError:
+			try:
+				os.unlink(tmp)
+			except OSError:
+				pass
+			return False
+
+	try:
+		os.utime(entry, ns=(time.time_ns(), os.stat(entry).st_mtime_ns))
+	except OSError:
+		pass
+
+	return True
+
+def store(key:str, path:str) -> bool:
+	"""
+	# Copy the artifact at &path into storage identified by &key.
+	# Returns &False when the artifact could not be stored.
+	"""
+	global _stores
+
+	entry = cache.path(namespace, key)
+	tmp = entry + '.' + str(os.getpid())
+
+	try:
+		os.makedirs(os.path.dirname(entry), exist_ok=True)
+		_clone(path, tmp)
+		os.replace(tmp, entry)
+	except OSError:
+		try:
+			os.unlink(tmp)
+		except OSError:
+			pass
+		return False
+
+	_stores += 1
+	if _stores % prune_frequency == 0:
+		cache.prune(namespace, limit)
+
+	return True
+
+def _replicate_file(origin, target, st, link):
+	tmp = target + '.' + str(os.getpid())
+	try:
+		_clone(origin, tmp, link=link)
+		if not os.path.samestat(st, os.stat(tmp)):
+			os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+		os.replace(tmp, target)
+	except BaseException:
+		try:
+			os.unlink(tmp)
+		except OSError:
+			pass
+		raise
+
+def _remove(path):
+	if os.path.isdir(path) and not os.path.islink(path):
+		shutil.rmtree(path)
+	else:
+		os.unlink(path)
+
+def replicate(origin:str, target:str, link:bool=False, workers:int=None) -> int:
+	"""
+	# Make the directory &target a replica of the directory &origin.
+
+	# Files whose size and modification time match the replica's are not copied, and
+	# entries absent from &origin are removed from &target. Files are reflinked,
+	# hardlinked when &link is permitted, or copied using a pool of &workers threads.
+	# Hardlinked files share their content, so &link is only safe when neither
+	# directory is modified in place; &.bin.delineate, for instance, rewrites its outputs.
+
+	# Returns the number of files replicated.
+	"""
+	origin = str(origin)
+	target = str(target)
+	jobs = []
+
+	for parent, dirs, filenames in os.walk(origin):
+		relative = os.path.relpath(parent, origin)
+		destination = os.path.normpath(os.path.join(target, relative))
+
+		if os.path.islink(destination) or (os.path.exists(destination) and not os.path.isdir(destination)):
+			os.unlink(destination)
+		os.makedirs(destination, exist_ok=True)
+
+		present = set(dirs)
+		present.update(filenames)
+		for x in os.listdir(destination):
+			if x not in present:
+				_remove(os.path.join(destination, x))
+
+		for x in dirs:
+			src = os.path.join(parent, x)
+			if os.path.islink(src):
+				filenames.append(x)
+		dirs[:] = [x for x in dirs if not os.path.islink(os.path.join(parent, x))]
+
+		for x in filenames:
+			src = os.path.join(parent, x)
+			dst = os.path.join(destination, x)
+			st = os.lstat(src)
+
+			if os.path.islink(src):
+				link_target = os.readlink(src)
+				if os.path.islink(dst) and os.readlink(dst) == link_target:
+					continue
+				if os.path.lexists(dst):
+					_remove(dst)
+				os.symlink(link_target, dst)
+				continue
+
+			try:
+				current = os.lstat(dst)
+			except FileNotFoundError:
+				pass
+			else:
+				if os.path.isdir(dst) and not os.path.islink(dst):
+					shutil.rmtree(dst)
+				elif current.st_size == st.st_size and current.st_mtime_ns == st.st_mtime_ns:
+					continue
+
+			jobs.append((src, dst, st, link))
+
+	if len(jobs) < 2 or workers == 0:
+		for job in jobs:
+			_replicate_file(*job)
+	else:
+		with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+			for f in [executor.submit(_replicate_file, *job) for job in jobs]:
+				f.result()
+
+	return len(jobs)
@@ -0,0 +1,276 @@
+"""
+# Measure the performance of the source, instrumentation, and trace hot paths.
+
+# The benchmarks are performed against a synthetic corpus and the results are written
+# as JSON so that the measurements of different commits can be compared. When the
+# results of a previous run are given, the ratios of the timings are printed.
+
+#!syntax/sh
+	python -m fault.integration.python.bin.benchmark results.json [previous.json]
+
+# [ Properties ]
+# /repetitions/
+	# The number of times each benchmark is performed; the minimum time is reported.
+"""
+import sys
+import time
+import json
+import itertools
+import tracemalloc
+
+from fault.system import process
+
+from .. import source
+from .. import module
+from .. import instrumentation
+from .. import trace
+
+repetitions = 3
+
+def small() -> str:
+	"""
+	# Construct a short module resembling common sources.
+	"""
+	return '\n'.join([
+		'"""',
+		'# Module documentation.',
+		'"""',
+		'import os',
+		'',
+		'class Sample(object):',
+		'	"""',
+		'	# Class documentation.',
+		'	"""',
+		'	def __init__(self, path):',
+		'		self.path = os.path.join(path, "data")',
+		'',
+		'	def read(self, size=-1):',
+		'		with open(self.path) as f:',
+		'			return [x.strip() for x in f.read(size).split("\\n") if x]',
+		'',
+		'def main(argv):',
+		'	s = Sample(argv[0])',
+		'	return len(s.read()) or (argv and argv[-1]) or None',
+		'',
+	])
+
+def deep(depth:int=90, chain:int=2000) -> str:
+	"""
+	# Construct a module with deeply nested blocks and expressions.
+	"""
+	lines = []
+	for i in range(depth):
+		lines.append(('\t' * i) + 'if x%d:' %(i,))
+	lines.append(('\t' * depth) + 'y = ' + ' + '.join(['f(a)'] * chain))
+	lines.append('z = ' + ('(' * 150) + '1' + (')' * 150))
+	lines.append('')
+	return '\n'.join(lines)
+
+def large(lines:int=50000) -> str:
+	"""
+	# Construct a module with approximately &lines lines.
+	"""
+	template = [
+		'def function_%d(a, b=None, *args, **kw):',
+		'	"""',
+		'	# Generated function.',
+		'	"""',
+		'	if a and b or not args:',
+		'		result = [x * 2 for x in range(a) if x %% 3]',
+		'	else:',
+		'		result = {k: v for k, v in kw.items()}',
+		'	return call(result, a.attribute[0], b, key=lambda x: x)',
+		'',
+	]
+
+	out = []
+	for i in itertools.count():
+		if len(out) >= lines:
+			break
+		out.extend(x %(i,) if '%d' in x else x.replace('%%', '%') for x in template)
+
+	return '\n'.join(out)
+
+def strings(count:int=2000) -> str:
+	"""
+	# Construct a module dominated by string literals.
+	"""
+	out = ['"""', '# Module with many strings.', '"""']
+	for i in range(count):
+		out.append('s%d = ("implicit" "concatenation" \'%d\')' %(i, i))
+		out.append('t%d = """' %(i,))
+		out.append('multiple')
+		out.append('lines %d"""' %(i,))
+		out.append('u%d = f"formatted {s%d!r:>10}" + b"bytes".decode()' %(i, i))
+	out.append('')
+	return '\n'.join(out)
+
+corpus = {
+	'small': small,
+	'deep': deep,
+	'large': large,
+	'strings': strings,
+}
+
+def parse(text):
+	lines, tree, nodes = source.parse(text, '<benchmark>')
+	for x in nodes:
+		pass
+
+def compile(text):
+	# A new in-memory cache so that each repetition delineates the source.
+	cache = source.Cache(namespace=None)
+	instrumentation.compile(None, text, '<benchmark>', [], parse=cache.parse, store=None)
+
+def digest(text):
+	module.hash_syntax(text)
+
+operations = {
+	'source.parse': parse,
+	'instrumentation.compile': compile,
+	'module.hash_syntax': digest,
+}
+
+def timing(operation, *args, repetitions=repetitions):
+	"""
+	# Identify the minimum time in seconds taken by the &operation and
+	# the peak memory allocated by it.
+	"""
+	times = []
+	for i in range(repetitions):
+		start = time.perf_counter()
+		operation(*args)
+		times.append(time.perf_counter() - start)
+
+	tracemalloc.start()
+	try:
+		operation(*args)
+		current, peak = tracemalloc.get_traced_memory()
+	finally:
+		tracemalloc.stop()
+
+	return {'seconds': min(times), 'peak': peak}
+
+def workload(n):
+	# Function calls and lines for the collector.
+	total = 0
+	for i in range(n):
+		total += len(str(i))
+	return total
+
+def collection(n:int=20000, repetitions=repetitions):
+	"""
+	# Measure the overhead of &trace.Collector per event and the throughput of &trace.measure.
+	"""
+	base = timing(workload, n, repetitions=repetitions)
+
+	events = []
+	collector = trace.Collector(events.append, itertools.count().__next__)
+	def traced(n):
+		del events[:]
+		with collector:
+			workload(n)
+
+	traced_timing = timing(traced, n, repetitions=repetitions)
+	count = len(events)
+	overhead = (traced_timing['seconds'] - base['seconds']) / count
+
+	measured = timing(trace.measure, list(events), repetitions=repetitions)
+
+	return [
+		{
+			'benchmark': 'trace.Collector',
+			'corpus': 'workload',
+			'events': count,
+			'seconds': traced_timing['seconds'],
+			'peak': traced_timing['peak'],
+			'overhead': overhead,
+		},
+		{
+			'benchmark': 'trace.measure',
+			'corpus': 'workload',
+			'events': count,
+			'seconds': measured['seconds'],
+			'peak': measured['peak'],
+			'throughput': count / measured['seconds'],
+		},
+	]
+
+def units(repetitions=repetitions):
+	"""
+	# Compare the size and load time of &module.dump_unit units with pickled trees.
+	"""
+	import pickle
+	results = []
+
+	for cname, generate in corpus.items():
+		text = generate()
+		tree = module.compile(None, text, '<benchmark>', [])
+
+		formats = [('module.load_unit', module.dump_unit('<benchmark>', tree), module.load_unit)]
+		try:
+			formats.append(('pickle.loads', pickle.dumps(('<benchmark>', tree)), pickle.loads))
+		except RecursionError:
+			# Pickling is recursive; the deeply nested corpus cannot be stored.
+			pass
+
+		for name, data, load in formats:
+			r = timing(load, data, repetitions=repetitions)
+			r.update(benchmark=name, corpus=cname, size=len(data))
+			results.append(r)
+
+	return results
+
+def run(repetitions=repetitions):
+	"""
+	# Perform the benchmarks and produce the list of results.
+	"""
+	results = []
+
+	for cname, generate in corpus.items():
+		text = generate()
+		for oname, operation in operations.items():
+			r = timing(operation, text, repetitions=repetitions)
+			r.update(benchmark=oname, corpus=cname, lines=text.count('\n'))
+			results.append(r)
+
+	results.extend(collection(repetitions=repetitions))
+	results.extend(units(repetitions=repetitions))
+	return results
+
+def compare(previous, current):
+	"""
+	# Produce the ratios of the times of the benchmarks in &current to those in &previous.
+	"""
+	index = {(x['benchmark'], x['corpus']): x for x in previous['results']}
+
+	for r in current['results']:
+		p = index.get((r['benchmark'], r['corpus']))
+		if p is None or not p['seconds']:
+			continue
+		yield r['benchmark'], r['corpus'], r['seconds'] / p['seconds'], r['peak'] / (p['peak'] or 1)
+
+def main(inv:process.Invocation) -> process.Exit:
+	target, *previous = inv.args
+
+	results = {
+		'python': sys.version,
+		'implementation': sys.implementation.cache_tag,
+		'repetitions': repetitions,
+		'results': run(),
+	}
+
+	with open(target, 'w') as f:
+		json.dump(results, f, indent=1)
+
+	if previous:
+		with open(previous[0]) as f:
+			prior = json.load(f)
+
+		for benchmark, cname, t, m in compare(prior, results):
+			sys.stdout.write('%s\t%s\t%.3fx time\t%.3fx memory\n' %(benchmark, cname, t, m))
+
+	return inv.exit(0)
+
+if __name__ == '__main__':
+	process.control(main, process.Invocation.system())
@@ -1,16 +1,34 @@
 """
 # Bind a system executable to a Python module factor.
+
+# The (python/module)`fault` modules are imported by the functions using them so that
+# rendering the source does not load the modules used to run the compiler.
+
+# [ Properties ]
+# /project_directory/
+	# The directory of the project containing the embedded executable's source.
+	# Constructed on first access.
 """
+from . import startup
+
 import os
 import sys
 
-from fault.text.bin import cat
-from fault.system import files
-from fault.system import identity
-from fault.system import execution
-from fault.system import query
+def _project_directory():
+	# Retrieve &project_directory, constructing it on first use.
+	global project_directory
+	try:
+		return project_directory
+	except NameError:
+		from fault.system import files
+		project_directory = files.Path.from_absolute(__file__) ** 2
+		return project_directory
+
+def __getattr__(name):
+	if name == 'project_directory':
+		return _project_directory()
 
-project_directory = (files.Path.from_absolute(__file__) ** 2)
+	raise AttributeError("module %r has no attribute %r" %(__name__, name))
 
 def compile_sc(target, source, include, compiler=None):
 	"""
@@ -133,6 +151,9 @@ def binding(platform, struct, executable, target_module, entry_point, *argv):
 	)
 
 def options(argv, symbol='main'):
+	from fault.system import files
+	from fault.system import identity
+
 	fpd = files.Path.from_absolute(files.__file__) ** 3
 	fl = (str(fpd), 'fault')
 	fi = True
@@ -184,10 +205,12 @@ def options(argv, symbol='main'):
 	return effect, verbose, symbol, platform, struct, argv[i:]
 
 def render(output, factor_path, factor_argv, factor_element, platform, struct):
+	from fault.text.bin import cat
+
 	for sf in binding(platform, struct, sys.executable, factor_path, factor_element, *factor_argv):
 		output(sf.encode('utf-8'))
 
-	sourcepath = project_directory / 'embed.txt'
+	sourcepath = _project_directory() / 'embed.txt'
 	data = cat.structure(sourcepath, 'executable')
 	for p in data.keys():
 		output(data[p].encode('utf-8'))
@@ -204,7 +227,10 @@ def main(sysargv):
 		# Create executable.
 		assert effect == 'executable'
 
-		includes = str(project_directory / 'include' / 'src')
+		from fault.system import execution
+		from fault.system import query
+
+		includes = str(_project_directory() / 'include' / 'src')
 		try:
 			xargv = compile_sc(target_exe, '/dev/stdin', includes, os.environ.get('CC') or None)
 		except ImportError:
@@ -238,6 +264,6 @@ def main(sysargv):
 
 if __name__ == '__main__':
 	try:
-		main(sys.argv)
+		startup.measure('bind', main)(sys.argv)
 	finally:
 		sys.stdout.flush()
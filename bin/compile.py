@@ -2,35 +2,111 @@
 # Compile Python modules into stored bytecode.
 
 # Provide high-level functions for compiling Python module into stored bytecode.
+
+# When invoked with `--batch`, job records are read from standard input as JSON lines
+# having `output`, `source`, and `parameters` fields, and a status line is written for
+# each job. `--socket` serves the same protocol on a Unix socket so that a build can
+# use a single warm process for all of its units. `--batch --jobs N` performs the jobs
+# using N processes while writing the status lines in the order of the records.
+
+# Modules are imported by the functions using them so that each job and pool
+# worker only loads what it needs; see &.startup for reporting the start-up time.
+# Likewise, the fingerprint index is only loaded by the processes performing batches;
+# a single compilation digests its source directly.
 """
+from . import startup
+
 import os
 import builtins
-import pickle
-
-from fault.system import process
-from fault.system import files
+import functools
 
 def mkbytecode(target, unit, language, dialect, optimize, parameters=None):
-	from .. import bytecode
+	"""
+	# Compile the &unit written by &mkast into stored bytecode at &target.
+
+	# Units holding only code compiled at another level than &optimize are
+	# compiled again from their origin using the intention and factor parameters.
+	"""
+	from .. import module
 
 	if not parameters:
 		parameters = {}
 
-	check = parameters.pop('check', 'time')
+	check = parameters.pop('check', 'raw')
 	intention = parameters.pop('intention', 'debug')
 	factor_name = parameters.pop('factor', None)
+	encoding = parameters.pop('encoding', 'utf-8')
 
 	with open(unit, 'rb') as f:
-		origin, stored_ast = pickle.load(f)
+		data = f.read()
 
-	co = builtins.compile(stored_ast, origin, 'exec', optimize=optimize)
-	bytecode.store('never', target, co, -1, None)
+	if data[:len(module.unit_magic)] == module.unit_magic:
+		compiled = module.load_unit_code(data, optimize)
+		if compiled is not None:
+			origin, co = compiled
+		else:
+			try:
+				origin, stored_ast = module.load_unit(data)
+				ast_optimize = optimize
+			except ValueError:
+				# Code-only unit; load_unit_origin raises for unsupported units.
+				origin = module.load_unit_origin(data)
+				stored_ast, ast_optimize = _compile_source(origin, optimize, {
+					'intention': intention,
+					'factor': factor_name,
+					'encoding': encoding,
+				})
+			co = builtins.compile(stored_ast, origin, 'exec', optimize=ast_optimize)
+	else:
+		# Units written before the unit format was introduced.
+		import pickle
+		origin, stored_ast = pickle.loads(data)
+		co = builtins.compile(stored_ast, origin, 'exec', optimize=optimize)
 
-def mkast(target, origin, language, dialect, optimize, parameters=None):
+	store(check, target, _finish(co, parameters), origin)
+
+def store(check, target, co, origin):
+	"""
+	# Store &co at &target using the &check method of &bytecode.store.
+	# The source at &origin is read when the method requires it.
+	"""
+	from .. import bytecode
+
+	if check == 'raw':
+		bytecode.store('raw', target, co, -1, None)
+	else:
+		with open(origin, 'rb') as f:
+			bytecode.store(check, target, co, f.fileno(), f.read())
+
+def _finish(co, parameters):
+	# Apply the deployment reductions selected by &parameters to &co.
 	from .. import module
 
-	if not parameters:
-		parameters = {}
+	if parameters.pop('columns', 'true') == 'false':
+		co = module.strip_columns(co)
+	return co
+
+_parse_cache = None
+
+def parse_cache():
+	"""
+	# Retrieve the &source.Cache storing the area tables of instrumented sources
+	# in the `parse` namespace.
+	"""
+	global _parse_cache
+	from .. import source
+
+	if _parse_cache is None:
+		_parse_cache = source.Cache(namespace='parse')
+
+	return _parse_cache
+
+def _compile_source(origin, optimize, parameters):
+	# Parse the source at &origin into the AST of a unit; shared by &mkast and &mkfused.
+	# Docstrings are removed from the units of the optimal intention regardless of &optimize.
+	# The areas of instrumented units are only recorded in the cache when the `areas`
+	# parameter is `true`.
+	from .. import module
 
 	check = parameters.pop('check', 'time')
 
@@ -38,8 +114,11 @@ def mkast(target, origin, language, dialect, optimize, parameters=None):
 	intention = parameters.pop('intention', 'debug')
 	if intention == 'coverage':
 		from .. import instrumentation
-		compiler = instrumentation.compile
+		compiler = functools.partial(instrumentation.compile, parse=parse_cache().parse)
 		optimize = 0
+
+		if parameters.pop('areas', 'false') == 'true':
+			compiler = functools.partial(compiler, store=instrumentation.store_areas)
 	else:
 		compiler = module.compile
 
@@ -49,9 +128,61 @@ def mkast(target, origin, language, dialect, optimize, parameters=None):
 	with open(origin, 'r', encoding=encoding) as f:
 		source_file_contents = f.read()
 
-	ast = compiler(factor_name, source_file_contents, origin, constants)
-	with open(target, 'wb') as out:
-		pickle.dump((str(origin), ast), out)
+	tree = compiler(factor_name, source_file_contents, origin, constants)
+	if intention == 'optimal':
+		module.strip_docstrings(tree)
+
+	return tree, optimize
+
+def mkast(target, origin, language, dialect, optimize, parameters=None):
+	"""
+	# Write the unit of the source at &origin to &target.
+
+	# By default, the unit holds the code compiled at the &optimize level as no
+	# transformations are performed after &mkast. The `unit-format` parameter
+	# selects `tree` to store the AST instead. The `columns` parameter set to `false`
+	# removes the column positions from the compiled code.
+	"""
+	from .. import module
+	from .. import artifacts
+
+	if not parameters:
+		parameters = {}
+
+	format = parameters.pop('unit-format', 'code')
+	ast, ast_optimize = _compile_source(origin, optimize, parameters)
+
+	if format == 'tree':
+		data = module.dump_unit(str(origin), ast)
+	else:
+		assert format == 'code'
+		co = builtins.compile(ast, str(origin), 'exec', optimize=ast_optimize)
+		data = module.dump_unit(str(origin), code=_finish(co, parameters), optimize=optimize)
+
+	artifacts.write(target, data)
+
+def mkfused(target, origin, language, dialect, optimize, parameters=None):
+	"""
+	# Compile the source at &origin directly into stored bytecode at &target.
+
+	# The AST unit is only written when the `unit` parameter is given; otherwise,
+	# the tree is compiled without being serialized.
+	"""
+	from .. import module
+	from .. import artifacts
+
+	if not parameters:
+		parameters = {}
+
+	unit = parameters.pop('unit', None)
+	check = parameters.pop('check', 'raw')
+	ast, optimize = _compile_source(origin, optimize, parameters)
+	co = _finish(builtins.compile(ast, str(origin), 'exec', optimize=optimize), parameters)
+
+	if unit is not None:
+		artifacts.write(unit, module.dump_unit(str(origin), ast, co, optimize))
+
+	store(check, target, co, str(origin))
 
 def delineate(output, origin, params):
 	from . import delineate
@@ -59,43 +190,360 @@ def delineate(output, origin, params):
 	delineate.process_source(str(output), str(origin), fpath)
 
 def replicate(target, origin):
-	(target).fs_alloc().fs_mkdir()
-	(target).fs_replace(origin)
+	"""
+	# Update the directory &target to be a replica of &origin; unchanged files are not copied.
+	"""
+	from .. import artifacts
+	artifacts.replicate(str(origin), str(target))
 
-def archive(output, source):
+def archive(output, source, format=None):
 	"""
 	# Copy the units directory, &source, to the target image location &output.
+	# When &format is `'bundle'`, the bytecode in &source is written as a single
+	# bundle file at &output instead.
 	"""
+	if format == 'bundle':
+		return mkbundle(str(output), str(source))
+
 	replicate(output, source)
 
-def main(inv:process.Invocation) -> process.Exit:
-	out, src, *remainder = inv.args
-	output = files.Path.from_path(out)
-	source = files.Path.from_path(src)
+def modules(directory):
+	"""
+	# Identify the bytecode files in &directory and the names of their modules.
+	# Produces `(name, path, package)` triples; name extensions are ignored.
 
-	params = dict()
-	params.update(zip(remainder[0::2], remainder[1::2]))
+	# Files without a bytecode suffix are skipped, and &ValueError is raised
+	# when more than one file identifies the same module.
+	"""
+	import importlib.machinery
+	suffixes = tuple(importlib.machinery.BYTECODE_SUFFIXES)
+	identified = {}
+
+	for parent, dirs, filenames in os.walk(directory):
+		dirs.sort()
+		relative = os.path.relpath(parent, directory)
+		prefix = [] if relative == '.' else relative.split(os.sep)
+
+		for filename in sorted(filenames):
+			if not filename.endswith(suffixes):
+				continue
+
+			stem = filename.split('.', 1)[0]
+			path = os.path.join(parent, filename)
+			if stem == '__init__':
+				if not prefix:
+					continue
+				name = '.'.join(prefix)
+				package = True
+			else:
+				name = '.'.join(prefix + [stem])
+				package = False
+
+			if name in identified:
+				raise ValueError("module %r is identified by both %r and %r" %(name, identified[name], path))
+			identified[name] = path
+
+			yield (name, path, package)
+
+def mkbundle(target, directory):
+	"""
+	# Write the bytecode files in &directory into the bundle at &target.
+	"""
+	import importlib.util
+	from .. import bytecode
+
+	magic = importlib.util.MAGIC_NUMBER
+
+	def read(path):
+		with open(path, 'rb') as f:
+			data = f.read()
+		if data[:4] == magic:
+			# Strip the PEP 552 header.
+			data = data[16:]
+		return data
+
+	return bytecode.bundle(target, (
+		(name, read(path), package)
+		for name, path, package in modules(directory)
+	))
 
-	intent = params.pop('intention', 'error')
+def execute(out, src, params):
+	"""
+	# Compile or delineate the unit at &src into &out as directed by the &params mapping.
+	"""
+	output = os.path.abspath(out)
+	source = os.path.abspath(src)
+	params = dict(params)
+
+	intent = params.get('intention', 'error')
 	optimize = int(params.pop('cpython-optimize', 1))
+	fused = params.pop('fused', 'false') == 'true'
 	language, dialect = params.pop('format', 'python.psf-v3').split('.', 1)
 	delineated = params.pop('delineated', None)
 
 	if delineated is not None:
 		if delineated == 'archive':
-			archive(output, source)
+			archive(output, source, params.pop('archive-format', None))
 		else:
 			assert delineated == 'json'
 			delineate(output, source, params)
 	else:
 		if dialect == 'ast':
-			mkbytecode(output, source, language, dialect, optimize, params)
+			kind, build = 'bytecode', mkbytecode
+		elif fused:
+			kind, build = 'fused', mkfused
+		else:
+			kind, build = 'ast', mkast
+
+		# Time checked headers depend on the status of the source rather than its content.
+		timed = kind != 'ast' and params.get('check', 'raw') == 'time'
+
+		if kind != 'ast':
+			kind += '-' + params.get('check', 'raw')
 		else:
-			mkast(output, source, language, dialect, optimize, params)
+			kind += '-' + params.get('unit-format', 'code')
+		if params.get('columns', 'true') == 'false':
+			kind += '-lines'
+
+		# Area tables are only recorded when the unit is built.
+		areas = params.get('areas', 'false') == 'true'
+
+		if params.pop('cache', 'true') != 'true' or 'unit' in params or timed or areas:
+			build(output, source, language, dialect, optimize, params)
+		else:
+			encoding = params.get('encoding', 'utf-8')
+			key = unit_key(kind, str(source), params.get('factor'), intent, optimize, encoding)
+			cached(key, str(output), functools.partial(
+				build, output, source, language, dialect, optimize, params
+			))
+
+_fingerprints = None
+
+def index():
+	"""
+	# Use a &fingerprint.Index to identify the sources of the units of this process.
+	# Used by the batch functions as loading the index is only worthwhile when
+	# the process performs many jobs.
+	"""
+	global _fingerprints
+	from .. import fingerprint
+
+	if _fingerprints is None:
+		_fingerprints = fingerprint.Index()
+
+	return _fingerprints
+
+def unit_key(kind, origin, factor, intention, optimize, encoding='utf-8') -> str:
+	"""
+	# Construct the &artifacts key of the &kind of unit produced from &origin.
+	# The source is digested directly unless &index was used.
+	"""
+	from .. import fingerprint
+	from .. import artifacts
+
+	if _fingerprints is None:
+		digest = fingerprint.digest(origin)
+	else:
+		digest = _fingerprints.fingerprint(origin)
+		if _fingerprints.noted >= 64:
+			# Periodically as pool workers do not exit through &save.
+			_fingerprints.save()
+
+	return artifacts.key(digest, kind, origin, encoding, factor, intention, optimize)
+
+def cached(key, target, build):
+	"""
+	# Materialize the artifact identified by &key at &target, or perform &build
+	# and store the artifact that it wrote to &target.
+	"""
+	from .. import artifacts
+
+	if artifacts.materialize(key, target):
+		return
+
+	# Builds replace &target through &artifacts.write, so a target
+	# linked to a stored artifact is not modified in place.
+	build()
+	artifacts.store(key, target)
+
+def save():
+	"""
+	# Store the fingerprints noted by &unit_key.
+	"""
+	if _fingerprints is not None:
+		_fingerprints.save()
+
+def parameters(record) -> dict:
+	"""
+	# Construct the parameters mapping of a job &record. Parameters may be given
+	# as a mapping or as the alternating keys and values used by the command line.
+	"""
+	params = record.get('parameters') or {}
+	if isinstance(params, dict):
+		return params
+
+	return dict(zip(params[0::2], params[1::2]))
+
+def perform(record, identifier=None) -> dict:
+	"""
+	# Execute the job described by &record and construct its status report.
+	"""
+	status = {'job': record.get('id', identifier)}
+
+	try:
+		execute(record['output'], record['source'], parameters(record))
+	except Exception as err:
+		status['status'] = 'failed'
+		status['error'] = err.__class__.__name__ + ': ' + str(err)
+	else:
+		status['status'] = 'complete'
+
+	return status
+
+def _records(input, state):
+	# Parse the job records of &input; iteration stops at a `shutdown` record.
+	import json
+
+	for i, line in enumerate(input):
+		line = line.strip()
+		if not line:
+			continue
+
+		try:
+			record = json.loads(line)
+			if not isinstance(record, dict):
+				raise ValueError("job record is not an object")
+		except ValueError as err:
+			yield i, None, 'ValueError: ' + str(err)
+			continue
+
+		if record.get('shutdown'):
+			state['shutdown'] = True
+			return
+
+		yield i, record, None
+
+def _job(item):
+	# Worker of &serve and &compile_all.
+	i, record, error = item
+	if error is not None:
+		return {'job': i, 'status': 'failed', 'error': error}
+
+	index()
+
+	return perform(record, i)
+
+def _dependencies():
+	# Construct the barrier used with &source.window by &serve and &compile_all.
+	# Jobs whose source is the output of an earlier job wait for the jobs before them.
+	outputs = set()
+
+	def barrier(item):
+		i, record, error = item
+		if record is None:
+			return False
+
+		dependent = os.path.abspath(str(record.get('source'))) in outputs
+		if dependent:
+			outputs.clear()
+		outputs.add(os.path.abspath(str(record.get('output'))))
+		return dependent
+
+	return barrier
+
+def serve(input, output, workers=0):
+	"""
+	# Read JSON job records from the lines of &input and write a status line
+	# to &output for each. Jobs are identified by their `id` field or their line number.
+
+	# When &workers is greater than one, the jobs are performed by a process pool
+	# and the status lines are written in the order of the records as the jobs complete.
+	# A job whose source is the output of an earlier job is performed after the jobs
+	# before it have completed.
+
+	# Returns &False if a `shutdown` record was received.
+	"""
+	import json
+	from .. import source
+	state = {'shutdown': False}
+
+	with source.pool(workers) as (executor, size):
+		jobs = _records(input, state)
+		for status in source.window(executor, _job, jobs, size, _dependencies()):
+			output.write(json.dumps(status) + '\n')
+			output.flush()
+
+	save()
+	return not state['shutdown']
+
+def compile_all(jobs, workers=None):
+	"""
+	# Perform the `(output, source, parameters)` &jobs using a pool of &workers processes.
+	# Returns the status of each job in the order of &jobs; like &serve, jobs depending
+	# on the output of an earlier job are performed after it.
+	"""
+	from .. import source
+
+	items = (
+		(i, {'output': str(out), 'source': str(src), 'parameters': params}, None)
+		for i, (out, src, params) in enumerate(jobs)
+	)
+
+	with source.pool(workers) as (executor, size):
+		statuses = list(source.window(executor, _job, items, size, _dependencies()))
+
+	save()
+	return statuses
+
+def listen(path):
+	"""
+	# Accept connections on the Unix socket at &path and &serve each of them
+	# until a `shutdown` record is received.
+	"""
+	import socket
+
+	try:
+		os.unlink(path)
+	except FileNotFoundError:
+		pass
+
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+		s.bind(path)
+		s.listen()
+
+		try:
+			while True:
+				connection, address = s.accept()
+				with connection, connection.makefile('r') as input, connection.makefile('w') as output:
+					if not serve(input, output):
+						break
+		finally:
+			os.unlink(path)
+
+def main(inv):
+	if inv.args[:1] == ['--batch']:
+		import sys
+		workers = 0
+		if inv.args[1:2] == ['--jobs']:
+			workers = int(inv.args[2])
+
+		serve(sys.stdin, sys.stdout, workers)
+		return inv.exit(0)
+	elif inv.args[:1] == ['--socket']:
+		listen(inv.args[1])
+		return inv.exit(0)
+
+	out, src, *remainder = inv.args
+
+	params = dict()
+	params.update(zip(remainder[0::2], remainder[1::2]))
+	execute(out, src, params)
+	save()
 
 	return inv.exit(0)
 
 if __name__ == '__main__':
 	import sys
 	sys.dont_write_bytecode = True
-	process.control(main, process.Invocation.system())
+	from fault.system import process
+	process.control(startup.measure('compile', main), process.Invocation.system())
@@ -1,6 +1,8 @@
 """
 # Delineate a Python source file.
 """
+from . import startup
+
 import sys
 import ast
 import functools
@@ -8,9 +10,6 @@ import typing
 import itertools
 import json
 
-from fault.system import process
-from fault.system import files
-
 from fault.syntax import types as syntax
 from fault.context import comethod
 from fault.context.tools import cachedcalls
@@ -533,7 +532,7 @@ def load(source_path:str, identifier=None):
 	with open(source_path) as f:
 		python_source = f.read()
 
-	srclines, tree, prepared = source.parse(python_source, source_path)
+	srclines, tree, prepared = source.shared.parse(python_source, source_path)
 	for snode, node, field, index in prepared:
 		node.Identifier = getattr(node, 'name', None)
 
@@ -553,6 +552,7 @@ def process_source(output, input, fpath):
 	x, = s.comethod('module')(root)
 	x[2]['source-encoding'] = 'utf-8'
 
+	from fault.system import files
 	r = files.Path.from_path(output)
 	r.fs_mkdir()
 
@@ -583,11 +583,23 @@ def process_source(output, input, fpath):
 	with (r/"data.json").fs_open('w') as f:
 		json.dump([keys, data], f)
 
-def main(inv:process.Invocation) -> process.Exit:
+def process_sources(jobs, workers=None):
+	"""
+	# Perform &process_source for each `(output, input, fpath)` triple in &jobs.
+	# The inputs are delineated in parallel by &source.prime beforehand.
+	"""
+	jobs = list(jobs)
+	source.prime([x[1] for x in jobs], workers=workers)
+
+	for output, input, fpath in jobs:
+		process_source(output, input, fpath)
+
+def main(inv):
 	target, source, fpath = inv.args
 	fpath = fpath.split('.')
-	process(target, source, fpath)
+	process_source(target, source, fpath)
 	return inv.exit(0)
 
 if __name__ == '__main__':
-	process.control(main, process.Invocation.system())
+	from fault.system import process
+	process.control(startup.measure('delineate', main), process.Invocation.system())
@@ -0,0 +1,80 @@
+"""
+# Start-up timing reports for the tools of &.bin.
+
+# When the &environment variable is set to a non-empty value, the `main` functions
+# wrapped by &measure write a line to standard error reporting the time spent loading
+# the tool before `main` was called, the time spent in `main`, and the number of
+# modules imported during each phase along with the names of the imported
+# (python/module)`fault` modules.
+
+# Tools import this module before any others so that the load time of the
+# tool's own imports is included in the report.
+
+# [ Properties ]
+# /environment/
+	# The name of the environment variable enabling the report.
+# /loaded/
+	# The &time.perf_counter value recorded when this module was imported.
+"""
+import os
+import sys
+import time
+
+environment = 'FAULT_PYTHON_STARTUP_REPORT'
+loaded = time.perf_counter()
+_initial = frozenset(sys.modules)
+
+def enabled() -> bool:
+	"""
+	# Whether the report was requested by the &environment.
+	"""
+	return bool(os.environ.get(environment))
+
+def report(name:str, started:float, finished:float, imported:frozenset, file=None) -> str:
+	"""
+	# Construct and write the report of the tool identified by &name to &file,
+	# standard error by default.
+
+	# [ Parameters ]
+	# /started/
+		# The &time.perf_counter value recorded when `main` was called.
+	# /finished/
+		# The &time.perf_counter value recorded when `main` exited.
+	# /imported/
+		# The modules present when `main` was called.
+	"""
+	current = frozenset(sys.modules)
+	load = imported - _initial
+	run = current - imported
+	faults = sorted(x for x in (current - _initial) if x.split('.', 1)[0] == 'fault')
+
+	line = "[startup] %s: load %.2fms (%d modules), main %.2fms (%d modules); fault: %s\n" % (
+		name,
+		(started - loaded) * 1000, len(load),
+		(finished - started) * 1000, len(run),
+		' '.join(faults) or 'none',
+	)
+
+	if file is None:
+		file = sys.stderr
+	file.write(line)
+	file.flush()
+
+	return line
+
+def measure(name:str, main):
+	"""
+	# Wrap &main to &report its timing when &enabled; otherwise, return &main.
+	"""
+	if not enabled():
+		return main
+
+	def measured(*args, **kw):
+		imported = frozenset(sys.modules)
+		started = time.perf_counter()
+		try:
+			return main(*args, **kw)
+		finally:
+			report(name, started, time.perf_counter(), imported)
+
+	return measured
@@ -0,0 +1,193 @@
+"""
+# Indexed files of marshalled code objects and the meta path finder loading them.
+
+# Bundles consist of a header, an index of entries sorted by module name, the names,
+# and the marshalled code of each module. &Finder maps the file once and locates
+# modules using a binary search of the index so that imports from the bundle
+# perform no filesystem operations.
+
+# [ Properties ]
+# /magic/
+	# The leading bytes identifying a bundle.
+# /version/
+	# The format version written by &Writer.
+"""
+import sys
+import mmap
+import struct
+import marshal
+import importlib.util
+import importlib.machinery
+
+from . import artifacts
+
+magic = b'\x93FPB'
+version = 1
+
+# magic, version, entry count, bytecode magic number.
+_header = struct.Struct('<4sHxxI4s')
+# name offset, name size, data offset, data size, flags.
+_entry = struct.Struct('<IIQQI4x')
+_package = 0x1
+
+class Writer(object):
+	"""
+	# Bundle writer collecting modules until &close.
+	"""
+
+	def __init__(self, path:str):
+		self.path = path
+		self._modules = {}
+
+	def add(self, name:str, code, package:bool=False):
+		"""
+		# Include the &code of the module identified by &name.
+		"""
+		self.add_marshalled(name, marshal.dumps(code), package)
+
+	def add_marshalled(self, name:str, data:bytes, package:bool=False):
+		"""
+		# Include the marshalled code, &data, of the module identified by &name.
+		"""
+		self._modules[name.encode('utf-8')] = (data, package)
+
+	def close(self) -> bool:
+		"""
+		# Write the bundle; &False when the file at &path was identical and left unmodified.
+		"""
+		names = sorted(self._modules)
+		count = len(names)
+		index = bytearray()
+
+		noffset = _header.size + (_entry.size * count)
+		doffset = noffset + sum(len(x) for x in names)
+
+		for name in names:
+			data, package = self._modules[name]
+			index += _entry.pack(noffset, len(name), doffset, len(data), _package if package else 0)
+			noffset += len(name)
+			doffset += len(data)
+
+		data = [_header.pack(magic, version, count, importlib.util.MAGIC_NUMBER), bytes(index)]
+		data.extend(names)
+		data.extend(self._modules[name][0] for name in names)
+
+		return artifacts.write(self.path, b''.join(data))
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, typ, val, tb):
+		if typ is None:
+			self.close()
+
+class Finder(object):
+	"""
+	# Meta path finder and loader of the modules in a bundle.
+	"""
+
+	@classmethod
+	def open(Class, path:str):
+		"""
+		# Map the bundle at &path into memory and construct a finder for it.
+		"""
+		with open(path, 'rb') as f:
+			memory = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		return Class(memory, path)
+
+	def __init__(self, memory, path:str=None):
+		self.memory = memory
+		self.path = path
+
+		fmagic, fversion, count, bcmagic = _header.unpack_from(memory, 0)
+		if fmagic != magic:
+			raise ValueError("not a bytecode bundle")
+		if fversion != version:
+			raise ValueError("unsupported bundle version: " + str(fversion))
+		if bcmagic != importlib.util.MAGIC_NUMBER:
+			raise ValueError("bundle was written by an incompatible Python")
+
+		self.count = count
+
+	def _entry(self, i):
+		return _entry.unpack_from(self.memory, _header.size + (i * _entry.size))
+
+	def lookup(self, name:str):
+		"""
+		# Identify the index entry of the module &name; &None if not present.
+		"""
+		key = name.encode('utf-8')
+		memory = self.memory
+		lo = 0
+		hi = self.count
+
+		while lo < hi:
+			mid = (lo + hi) // 2
+			entry = self._entry(mid)
+			current = memory[entry[0]:entry[0]+entry[1]]
+			if current < key:
+				lo = mid + 1
+			elif current > key:
+				hi = mid
+			else:
+				return entry
+
+		return None
+
+	def names(self):
+		"""
+		# Iterate over the names of the modules in the bundle in order.
+		"""
+		for i in range(self.count):
+			entry = self._entry(i)
+			yield self.memory[entry[0]:entry[0]+entry[1]].decode('utf-8')
+
+	def find_spec(self, fullname, path=None, target=None):
+		entry = self.lookup(fullname)
+		if entry is None:
+			return None
+
+		package = bool(entry[4] & _package)
+		spec = importlib.machinery.ModuleSpec(fullname, self, origin=self.path, is_package=package)
+		if package:
+			spec.submodule_search_locations = []
+		return spec
+
+	def create_module(self, spec):
+		return None
+
+	def get_code(self, fullname):
+		entry = self.lookup(fullname)
+		if entry is None:
+			raise ImportError("module not in bundle: " + fullname, name=fullname)
+
+		return marshal.loads(self.memory[entry[2]:entry[2]+entry[3]])
+
+	def is_package(self, fullname):
+		entry = self.lookup(fullname)
+		if entry is None:
+			raise ImportError("module not in bundle: " + fullname, name=fullname)
+
+		return bool(entry[4] & _package)
+
+	def get_source(self, fullname):
+		return None
+
+	def exec_module(self, module):
+		# The bundle is not a location of the module;
+		# the path of the source that the code was compiled from is used.
+		code = self.get_code(module.__spec__.name)
+		module.__file__ = code.co_filename
+		exec(code, module.__dict__)
+
+	def invalidate_caches(self):
+		pass
+
+def install(path:str, index:int=0) -> Finder:
+	"""
+	# Add a &Finder for the bundle at &path to &sys.meta_path.
+	"""
+	finder = Finder.open(path)
+	sys.meta_path.insert(index, finder)
+	return finder
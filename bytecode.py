@@ -12,6 +12,8 @@ import types
 import importlib
 import marshal
 
+from . import artifacts
+
 try:
 	from _imp import source_hash
 	from importlib._bootstrap_external import _RAW_MAGIC_NUMBER, _code_to_timestamp_pyc, _code_to_hash_pyc
@@ -31,29 +33,61 @@ def store(check:str, target:str, code:types.CodeType, fileno:int, source:bytes)
 	"""
 	# Store the given &code object at the &target location system path.
 	# The stored data should be suitable for use as a pycs file within __pycache__.
+	# &target is replaced atomically and is not modified when it holds identical data.
+
 	# [ Parameters ]
 	# /check/
-		# - `'never'`
-		# - `'time'`
-		# - `'hash'`
+		# - `'raw'`, the marshalled &code without a header.
+		# - `'time'`, a header with the modification time and size of &fileno.
+		# - `'hash'`, a header with the hash of &source that is checked by the importer.
+		# - `'never'`, a header with the hash of &source that is not checked.
+
+		# Hash based headers require Python 3.7 or greater; time based headers
+		# are written by earlier versions.
+	# /fileno/
+		# The file descriptor of the source; used by `'time'`.
+	# /source/
+		# The bytes of the source; used by `'hash'` and `'never'`.
 	"""
 
-	method = None
-	if 0:
-		if check in {None, 'time'} or local_source_hash is None:
-			stat = os.fstat(fileno)
-			method = (stat.st_mtime, stat.st_size)
-			data = serialize_timestamp_checked(code, *method)
-		elif check == 'hash':
-			method = local_source_hash(source)
-			data = _code_to_hash_pyc(code, method)
-		elif check == 'never':
-			method = local_source_hash(source)
-			data = _code_to_hash_pyc(code, method, checked=False)
-	else:
+	if check == 'raw':
+		method = None
 		data = marshal.dumps(code)
+	elif check in {None, 'time'} or local_source_hash is None:
+		stat = os.fstat(fileno)
+		method = (int(stat.st_mtime), stat.st_size)
+		data = serialize_timestamp_checked(code, *method)
+	elif check == 'hash':
+		method = local_source_hash(source)
+		data = _code_to_hash_pyc(code, method, checked=True)
+	elif check == 'never':
+		method = local_source_hash(source)
+		data = _code_to_hash_pyc(code, method, checked=False)
+	else:
+		raise ValueError("unknown bytecode check method: " + repr(check))
 
-	with open(str(target), 'wb') as f:
-		f.write(data)
-
+	artifacts.write(target, data)
 	return (method, code)
+
+def bundle(target:str, modules) -> int:
+	"""
+	# Store the code objects of &modules in a single &.bundle file at &target.
+
+	# [ Parameters ]
+	# /modules/
+		# Iterable of `(name, code, package)` triples. &code may be a code object
+		# or its marshalled bytes.
+	"""
+	from . import bundle
+
+	count = 0
+	w = bundle.Writer(str(target))
+	for name, code, package in modules:
+		if isinstance(code, bytes):
+			w.add_marshalled(name, code, package)
+		else:
+			w.add(name, code, package)
+		count += 1
+	w.close()
+
+	return count
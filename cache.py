@@ -0,0 +1,130 @@
+"""
+# Local storage for data derived from Python sources.
+
+# Entries are marshalled objects stored under a namespace directory and keyed by
+# a content digest; usually, the digest of the source that the data was derived from.
+# The cache is advisory: failures to store entries are ignored and corrupt or
+# missing entries are reported as absent.
+
+# Loading an entry updates its modification time so that &prune can evict
+# the least recently used entries of a namespace. Entries whose modification
+# time must be preserved are used by updating their access time instead.
+
+# [ Properties ]
+# /environment/
+	# The environment variable that, when set, selects the root cache directory.
+"""
+import os
+import marshal
+import contextlib
+
+environment = 'FAULT_PYTHON_CACHE'
+
+def root() -> str:
+	"""
+	# Identify the root cache directory.
+	"""
+	path = os.environ.get(environment)
+	if path:
+		return path
+
+	xdg = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+	return os.path.join(xdg, 'fault-python')
+
+@contextlib.contextmanager
+def redirect(path:str):
+	"""
+	# Select &path as the root cache directory until the context exits.
+	"""
+	previous = os.environ.get(environment)
+	os.environ[environment] = path
+	try:
+		yield path
+	finally:
+		if previous is None:
+			del os.environ[environment]
+		else:
+			os.environ[environment] = previous
+
+def path(namespace:str, key:str) -> str:
+	"""
+	# Construct the path to the entry identified by &key in &namespace.
+	"""
+	return os.path.join(root(), namespace, key[:2], key[2:])
+
+def load(namespace:str, key:str):
+	"""
+	# Retrieve the entry identified by &key in &namespace.
+	# Returns &None when the entry is not present or cannot be read.
+	"""
+	try:
+		with open(path(namespace, key), 'rb') as f:
+			data = marshal.load(f)
+			try:
+				os.utime(f.fileno())
+			except OSError:
+				pass
+			return data
+	except (OSError, EOFError, ValueError, TypeError):
+		return None
+
+def store(namespace:str, key:str, data) -> bool:
+	"""
+	# Marshal &data into the entry identified by &key in &namespace.
+	# Returns &False when the entry could not be written.
+	"""
+	target = path(namespace, key)
+	tmp = target + '.' + str(os.getpid())
+
+	try:
+		os.makedirs(os.path.dirname(target), exist_ok=True)
+		with open(tmp, 'wb') as f:
+			marshal.dump(data, f)
+		os.replace(tmp, target)
+	except OSError:
+		try:
+			os.unlink(tmp)
+		except OSError:
+			pass
+		return False
+
+	return True
+
+def prune(namespace:str, limit:int) -> int:
+	"""
+	# Remove the least recently used entries of &namespace until the
+	# total size of its entries is no more than &limit bytes. The later of the
+	# access and modification times of an entry identifies its last use.
+	# Returns the number of bytes removed.
+	"""
+	entries = []
+	try:
+		with os.scandir(os.path.join(root(), namespace)) as prefixes:
+			for prefix in prefixes:
+				if not prefix.is_dir():
+					continue
+				with os.scandir(prefix.path) as d:
+					for x in d:
+						try:
+							st = x.stat()
+						except OSError:
+							continue
+						used = max(st.st_atime_ns, st.st_mtime_ns)
+						entries.append((used, st.st_size, x.path))
+	except OSError:
+		return 0
+
+	total = sum(x[1] for x in entries)
+	removed = 0
+	entries.sort()
+
+	for used, size, path in entries:
+		if total - removed <= limit:
+			break
+		try:
+			os.unlink(path)
+		except OSError:
+			continue
+		removed += size
+
+	return removed
@@ -0,0 +1,457 @@
+"""
+# Compact binary storage for coverage counters.
+
+# Counter files consist of a header followed by a sequence of frames. Each frame holds
+# a path string table, the areas of the counted nodes as packed `uint32` quads, and
+# the counts as a `uint64` column. Records are grouped by path so that the areas
+# and counts of a path are contiguous and can be accessed as views of the file.
+
+# Frames are independent; files may be extended by appending frames and readers
+# sum the counts of every frame.
+
+# &snapshot and &difference isolate the counts recorded by a period of execution,
+# and &Index associates those counts with the test that produced them. &Flusher
+# uses them to append the counts of long running processes to a file as they accumulate.
+
+# [ Properties ]
+# /magic/
+	# The leading bytes identifying a counter file.
+# /version/
+	# The format version written by &Writer.
+"""
+import sys
+import mmap
+import array
+import struct
+import marshal
+import threading
+import collections
+
+magic = b'\x93FPC'
+version = 1
+
+_byteorders = {'little': 0, 'big': 1}
+_header = struct.Struct('<4sBB2x')
+_frame = struct.Struct('<4sIII')
+_frame_magic = b'FRME'
+
+def _padding(size, alignment=8):
+	return -size % alignment
+
+class Writer(object):
+	"""
+	# Streaming writer for counter files.
+
+	# Records are buffered by path and emitted as a frame when &limit records
+	# are pending or when &flush is called.
+	"""
+
+	def __init__(self, file, limit=1024*64):
+		self.file = file
+		self.limit = limit
+		self._pending = {}
+		self._count = 0
+
+		if file.tell() == 0:
+			file.write(_header.pack(magic, version, _byteorders[sys.byteorder]))
+
+	def write(self, path:str, area, count:int):
+		"""
+		# Add a record noting the &count of the &area in the file identified by &path.
+		"""
+		try:
+			areas, counts = self._pending[path]
+		except KeyError:
+			areas = array.array('I')
+			counts = array.array('Q')
+			self._pending[path] = (areas, counts)
+
+		areas.extend(area)
+		counts.append(count)
+
+		self._count += 1
+		if self._count >= self.limit:
+			self.flush()
+
+	def extend(self, path:str, records):
+		"""
+		# Add a sequence of `(area, count)` pairs for the file identified by &path.
+		"""
+		for area, count in records:
+			self.write(path, area, count)
+
+	def flush(self):
+		"""
+		# Write the pending records as a frame.
+		"""
+		if not self._pending:
+			return
+
+		paths = list(self._pending)
+		strtab = b'\x00'.join(x.encode('utf-8') for x in paths)
+		sizes = array.array('I', [len(self._pending[x][1]) for x in paths])
+
+		write = self.file.write
+		write(_frame.pack(_frame_magic, len(paths), self._count, len(strtab)))
+		write(sizes.tobytes())
+		write(strtab)
+		write(b'\x00' * _padding(len(sizes) * sizes.itemsize + len(strtab)))
+
+		for x in paths:
+			write(self._pending[x][0].tobytes())
+		for x in paths:
+			write(self._pending[x][1].tobytes())
+
+		self._pending.clear()
+		self._count = 0
+
+	def close(self):
+		"""
+		# Flush any pending records.
+		"""
+		self.flush()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class Reader(object):
+	"""
+	# Counter file reader providing access to the columns of each frame as views
+	# of the underlying memory.
+	"""
+
+	@classmethod
+	def open(Class, path:str):
+		"""
+		# Map the file at &path into memory and construct a reader for it.
+		"""
+		with open(path, 'rb') as f:
+			try:
+				memory = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			except ValueError:
+				# Empty file.
+				memory = b''
+
+		return Class(memory)
+
+	def __init__(self, memory):
+		self.memory = memory
+		self.view = memoryview(memory)
+
+		if len(self.view) == 0:
+			self.swapped = False
+			return
+
+		fmagic, fversion, order = _header.unpack_from(self.view, 0)
+		if fmagic != magic:
+			raise ValueError("not a counter file")
+		if fversion != version:
+			raise ValueError("unsupported counter file version: " + str(fversion))
+
+		self.swapped = (order != _byteorders[sys.byteorder])
+
+	def _column(self, data, typecode):
+		if self.swapped:
+			a = array.array(typecode)
+			a.frombytes(data)
+			a.byteswap()
+			return a
+
+		return data.cast(typecode)
+
+	def frames(self):
+		"""
+		# Iterate over the frames in the file producing triples containing
+		# the path list, the area column, and the count column.
+
+		# A trailing frame that was not completely written, as when the writing
+		# process was terminated during a flush, ends the iteration; the complete
+		# frames before it are still produced.
+		"""
+		view = self.view
+		offset = _header.size
+		end = len(view)
+
+		while offset + _frame.size <= end:
+			fmagic, npaths, nrecords, strsize = _frame.unpack_from(view, offset)
+			if fmagic != _frame_magic:
+				raise ValueError("corrupt counter frame at offset " + str(offset))
+
+			tables = npaths * 4 + strsize
+			if offset + _frame.size + tables + _padding(tables) + (nrecords * 24) > end:
+				# Incomplete frame.
+				break
+			offset += _frame.size
+
+			sizes = self._column(view[offset:offset+(npaths*4)], 'I')
+			offset += npaths * 4
+			strtab = bytes(view[offset:offset+strsize])
+			offset += strsize + _padding(npaths * 4 + strsize)
+
+			paths = strtab.decode('utf-8').split('\x00') if npaths else []
+			areas = self._column(view[offset:offset+(nrecords*16)], 'I')
+			offset += nrecords * 16
+			counts = self._column(view[offset:offset+(nrecords*8)], 'Q')
+			offset += nrecords * 8
+
+			yield list(zip(paths, sizes)), areas, counts
+
+	def select(self):
+		"""
+		# Iterate over the records of each path in each frame producing
+		# triples containing the path, its area column, and its count column.
+		"""
+		for paths, areas, counts in self.frames():
+			i = 0
+			for path, size in paths:
+				yield path, areas[i*4:(i+size)*4], counts[i:i+size]
+				i += size
+
+	def items(self):
+		"""
+		# Construct a mapping of paths to &collections.Counter instances
+		# summing the counts of every frame.
+		"""
+		data = collections.defaultdict(collections.Counter)
+
+		for path, areas, counts in self.select():
+			c = data[path]
+			for area, count in zip(quads(areas), counts):
+				c[area] += count
+
+		return data
+
+	def close(self):
+		try:
+			self.view.release()
+			if isinstance(self.memory, mmap.mmap):
+				self.memory.close()
+		except BufferError:
+			# Columns are still referenced; the mapping is released on collection.
+			pass
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class Index(object):
+	"""
+	# Test to area index identifying the tests that executed an area.
+
+	# [ Properties ]
+	# /tests/
+		# The identifiers of the tests in the order that they were added.
+	# /areas/
+		# Mapping of paths to mappings of areas to the test numbers that executed them.
+	"""
+
+	def __init__(self):
+		self.tests = []
+		self.areas = {}
+
+	def add(self, test, records):
+		"""
+		# Note &test as the executor of the `(path, area)` pairs in &records.
+		"""
+		n = len(self.tests)
+		self.tests.append(test)
+
+		for path, area in records:
+			try:
+				pareas = self.areas[path]
+			except KeyError:
+				pareas = self.areas[path] = {}
+
+			try:
+				pareas[area].append(n)
+			except KeyError:
+				pareas[area] = array.array('I', (n,))
+
+	def select(self, path:str, start:int=1, stop:int=None):
+		"""
+		# Identify the tests that executed areas in &path intersecting
+		# the lines from &start to &stop inclusive.
+		"""
+		selection = set()
+		for area, tests in self.areas.get(path, {}).items():
+			if area[2] < start or (stop is not None and area[0] > stop):
+				continue
+			selection.update(tests)
+
+		return set(self.tests[x] for x in selection)
+
+	def serialize(self) -> bytes:
+		"""
+		# Construct the marshalled form of the index; areas and test numbers are
+		# stored as packed columns.
+		"""
+		paths = []
+		for path, pareas in self.areas.items():
+			areas = array.array('I')
+			offsets = array.array('I', (0,))
+			tests = array.array('I')
+
+			for area, atests in pareas.items():
+				areas.extend(area)
+				tests.extend(atests)
+				offsets.append(len(tests))
+
+			paths.append((path, areas.tobytes(), offsets.tobytes(), tests.tobytes()))
+
+		return marshal.dumps((version, sys.byteorder, self.tests, paths))
+
+	@classmethod
+	def load(Class, data:bytes):
+		"""
+		# Construct an instance from the &serialize form of an index.
+		"""
+		iversion, order, tests, paths = marshal.loads(data)
+		if iversion != version:
+			raise ValueError("unsupported index version: " + str(iversion))
+
+		swap = (order != sys.byteorder)
+		def column(data):
+			a = array.array('I')
+			a.frombytes(data)
+			if swap:
+				a.byteswap()
+			return a
+
+		i = Class()
+		i.tests = tests
+		for path, areas, offsets, atests in paths:
+			offsets = column(offsets)
+			atests = column(atests)
+			i.areas[path] = {
+				area: atests[offsets[x]:offsets[x+1]]
+				for x, area in enumerate(quads(column(areas)))
+			}
+
+		return i
+
+def snapshot(store) -> dict:
+	"""
+	# Copy the counts in the counter &store for use with &difference.
+	"""
+	return dict(store)
+
+def difference(store, snapshot):
+	"""
+	# Iterate over the `(key, count)` pairs of &store that changed since &snapshot
+	# producing the counts accumulated after the snapshot was taken.
+	"""
+	get = snapshot.get
+	for key, count in store.items() - snapshot.items():
+		yield key, count - get(key, 0)
+
+class Flusher(object):
+	"""
+	# Background writer appending the counts accumulated in a counter store to a file.
+
+	# Each flush appends a frame containing the counts recorded since the previous flush;
+	# the sum of the frames is the content of the store at the time of the last flush.
+
+	# [ Properties ]
+	# /store/
+		# The mapping of `(path, area)` pairs to counts.
+	# /path/
+		# The file that frames are appended to.
+	# /interval/
+		# The number of seconds between flushes; &None to only flush on request.
+	# /adjust/
+		# Callable converting a `((path, area), count)` pair into the
+		# `(path, area, count)` triple written to the file.
+	"""
+
+	def __init__(self, store, path:str, interval:float=None, adjust=None):
+		self.store = store
+		self.path = path
+		self.interval = interval
+		self.adjust = adjust or (lambda x: (x[0][0], x[0][1], x[1]))
+
+		self._snapshot = {}
+		self._lock = threading.Lock()
+		self._event = threading.Event()
+		self._terminated = False
+		self._thread = None
+
+	def flush(self):
+		"""
+		# Append the counts recorded since the last flush to &path.
+		"""
+		with self._lock:
+			current = snapshot(self.store)
+			adjust = self.adjust
+
+			with open(self.path, 'ab') as f, Writer(f) as w:
+				for record in difference(current, self._snapshot):
+					w.write(*adjust(record))
+
+			self._snapshot = current
+
+	def request(self, *args):
+		"""
+		# Signal the flushing thread to write the accumulated counts.
+		# Suitable for use as a signal handler.
+		"""
+		self._event.set()
+
+	def _loop(self):
+		while not self._terminated:
+			self._event.wait(self.interval)
+			self._event.clear()
+			if self._terminated:
+				break
+
+			try:
+				self.flush()
+			except OSError:
+				# Retry on the next interval.
+				pass
+
+	def start(self):
+		"""
+		# Start the flushing thread.
+		"""
+		self._thread = threading.Thread(target=self._loop, name='counters-flush', daemon=True)
+		self._thread.start()
+
+	def terminate(self):
+		"""
+		# Stop the flushing thread and write the final counts.
+		"""
+		self._terminated = True
+		self._event.set()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
+
+		self.flush()
+
+def quads(column):
+	"""
+	# Iterate over the area tuples in the given &column.
+	"""
+	i = iter(column)
+	return zip(i, i, i, i)
+
+def store(file, data):
+	"""
+	# Write the counters in the mapping, &data, to &file.
+	# &data is a two level mapping keyed by path then area.
+	"""
+	with Writer(file) as w:
+		for path, counters in data.items():
+			w.extend(path, counters.items())
+
+def load(path:str):
+	"""
+	# Read the counters stored at &path into a two level mapping keyed by path then area.
+	"""
+	with Reader.open(path) as r:
+		return r.items()
@@ -1,46 +1,177 @@
 """
 # Support for Python coverage tooling suitable for fault metrics contexts.
 """
+import os
 import sys
+import array
+import zlib
+import signal
+import functools
 import contextlib
 import collections
 import pickle
 import itertools
+import tempfile
 
 from ...coherence import metrics
 
 from . import instrumentation
 from . import source
+from . import module
+from . import counters
+
+def partition(path:str, partitions:int) -> int:
+	"""
+	# Identify the partition of &path; stable across processes.
+	"""
+	return zlib.crc32(path.encode('utf-8', 'surrogateescape')) % partitions
+
+def load_profile(route:str, index:int=0, partitions:int=1):
+	"""
+	# Read the profile data stored at &route selecting the calls
+	# whose path is in the partition identified by &index.
+	"""
+	try:
+		with open(route, 'rb') as f:
+			profile = pickle.load(f)
+	except (EOFError, FileNotFoundError):
+		return {}
+
+	if partitions == 1:
+		return profile
+
+	return {
+		k: v for k, v in profile.items()
+		if partition(k[1][0], partitions) == index
+	}
+
+def spill_profile(job, partitions:int):
+	"""
+	# Read the profile data stored at the route of &job once and write the calls
+	# of each partition to a separate file whose path is the prefix of &job
+	# followed by the partition index.
+
+	# Returns the indexes of the partitions that were written.
+	"""
+	route, prefix = job
+	selections = collections.defaultdict(dict)
+	for k, v in load_profile(route).items():
+		selections[partition(k[1][0], partitions)][k] = v
+
+	for index, data in selections.items():
+		with open(prefix + str(index), 'wb') as f:
+			pickle.dump(data, f)
+
+	return list(selections)
+
+def load_counters(route:str):
+	"""
+	# Read the counter file at &route into a list of triples containing
+	# the path, the area column, and the count column.
+
+	# Returns &None if the file does not exist.
+	"""
+	try:
+		r = counters.Reader.open(route)
+	except FileNotFoundError:
+		return None
+
+	with r:
+		return [
+			(path, array.array('I', areas), array.array('Q', counts))
+			for path, areas, counts in r.select()
+		]
+
+def adjust(counter):
+	"""
+	# Convert a counter store entry into the triple written to counter files.
+	"""
+	(path, address), count = counter
+	sl, sc, el, ec = address
+	return path, (sl,sc+1,el,ec+1), count
+
+window = source.window
 
 class Probe(metrics.Probe):
+	"""
+	# Python coverage probe.
+
+	# [ Properties ]
+	# /workers/
+		# The number of processes used to read measurements.
+		# &None selects the CPU count; `0` reads measurements in the current process.
+	# /partitions/
+		# The maximum number of partitions that profile data is split into
+		# when aggregating. Each measurement is read once and its partitions
+		# are written to temporary files.
+	# /flush_interval/
+		# The number of seconds between counter flushes in reconnected processes.
+	# /flush_signal/
+		# The signal requesting a counter flush in reconnected processes.
+		# Only installed when the signal has the default disposition.
+	"""
+
+	workers = None
+	partitions = 16
+	flush_interval = 30.0
+	flush_signal = signal.SIGUSR1
+
 	def project(self, telemetry, route, frames):
 		"""
 		# Identify counters in the Python factor sources.
+
+		# The area tables recorded by &instrumentation.compile are used when available;
+		# otherwise, the sources are delineated in parallel using &source.prime.
 		"""
 		data = collections.defaultdict(dict)
+		recorded = {}
+		missing = []
 
 		for factor, pyc in frames.items():
 			src = str(pyc[-1][0])
 			with open(src) as f:
-				srclines, tree, nodes = source.parse(f.read(), src, filter=instrumentation.visit)
+				text = f.read()
+
+			recorded[src] = (text, instrumentation.load_areas(module.hash_syntax(text)))
+			if recorded[src][1] is None:
+				missing.append(src)
+
+		tables = source.shared
+		if len(missing) > 1:
+			# Delineate the sources without recorded tables in parallel.
+			tables = source.Cache(size=len(missing))
+			source.prime(missing, workers=self.workers, cache=tables)
+
+		for src, (text, table) in recorded.items():
+			if table is None:
+				table = self.delineate(text, src, tables)
 
-			selector = ((node, instrumentation.delineate(node)) for node in nodes)
 			data[src] = {
-				(addr[0], addr[1]+1, addr[2], addr[3]): (
-					(addr[0], addr[1]+1, addr[2], addr[3]),
-					node[0].__class__.__name__
-					if not isinstance(node[0], (source.ast.Str, source.ast.Name))
-					else '%s[%s]' %(
-						node[1].__class__.__name__,
-						node[0].__class__.__name__,
-					)
-				)
-				for node, addr in selector
-				if addr is not None
+				area: (area, typ)
+				for area, typ in table
 			}
 
 		return data
 
+	@staticmethod
+	def delineate(text, src, cache=source.shared):
+		"""
+		# Parse the source, &text, and identify the areas and types of its counters.
+		# The area table is retrieved from &cache when present.
+		"""
+		srclines, tree, table = cache.table(text, src)
+
+		selector = (
+			(node, table.delineate(table.select(node[0])))
+			for node in instrumentation.visit(tree)
+			if isinstance(node[0], source.ast.AST)
+		)
+		return [
+			((addr[0], addr[1]+1, addr[2], addr[3]), instrumentation.identify(node))
+			for node, addr in selector
+			if addr is not None
+		]
+
 	def override(self, executable=sys.executable):
 		"""
 		# Adjust the system.execution method for Python scripts and modules to inherit the
@@ -70,22 +201,27 @@ class Probe(metrics.Probe):
 		finally:
 			pass
 
-	def transmit(self, directory):
+	def transmit(self, directory, snapshot=None):
+		"""
+		# Write the profile and coverage data to &directory.
+		# When &snapshot is given, only the counts accumulated since it was taken are written.
+		"""
 		m = directory / 'profile.pickle'
 		with m.fs_open('wb') as f:
 			pickle.dump({}, f)
 
 		try:
 			from f_intention.python import instrumentation as python_tm
-			m = directory / 'coverage.pickle'
-			data = collections.defaultdict(collections.Counter)
-			for counter in python_tm.counters.items():
-				(path, address), count = counter
-				sl, sc, el, ec = address
-				data[path][(sl,sc+1,el,ec+1)] = count
-
-			with m.fs_open('wb') as f:
-				pickle.dump(data, f)
+			m = directory / 'coverage.counters'
+
+			if snapshot is None:
+				records = python_tm.counters.items()
+			else:
+				records = counters.difference(python_tm.counters, snapshot)
+
+			with m.fs_open('wb') as f, counters.Writer(f) as w:
+				for counter in records:
+					w.write(*adjust(counter))
 		except ImportError:
 			raise
 
@@ -94,18 +230,56 @@ class Probe(metrics.Probe):
 		"""
 		# Construct a trace and subscribe to interpreter events
 		# for the duration of the test. Profile and coverage information
-		# is emitted as a pickle file relative to &measures.
+		# is emitted relative to &measures.
+
+		# The counters are snapshotted at the start of the test so that only the
+		# counts contributed by the test are emitted.
 		"""
+		from f_intention.python import instrumentation as python_tm
+		snapshot = counters.snapshot(python_tm.counters)
 
 		try:
 			yield None
 		finally:
-			self.transmit(measures / self.name)
+			self.transmit(measures / self.name, snapshot)
 
 	def reconnect(self, measures, process_data, finder):
+		"""
+		# Prepare a subprocess for collection. Counters are appended to the process'
+		# counter file every &flush_interval seconds, when &flush_signal is received,
+		# and when the process exits.
+		"""
 		import atexit
+		from f_intention.python import instrumentation as python_tm
 		self.override()
-		atexit.register(self.transmit, process_data / self.name)
+
+		directory = process_data / self.name
+		flusher = counters.Flusher(
+			python_tm.counters,
+			str(directory / 'coverage.counters'),
+			self.flush_interval, adjust
+		)
+
+		if self.flush_signal is not None:
+			try:
+				if signal.getsignal(self.flush_signal) == signal.SIG_DFL:
+					signal.signal(self.flush_signal, flusher.request)
+			except ValueError:
+				# Not the main thread.
+				pass
+
+		flusher.start()
+		atexit.register(self.disconnect, directory, flusher)
+
+	def disconnect(self, directory, flusher):
+		"""
+		# Write the profile data and the final counters of a process reconnected by &reconnect.
+		"""
+		m = directory / 'profile.pickle'
+		with m.fs_open('wb') as f:
+			pickle.dump({}, f)
+
+		flusher.terminate()
 
 	@staticmethod
 	def abstract_call_selector(call):
@@ -120,33 +294,112 @@ class Probe(metrics.Probe):
 
 		return path, metrics.SymbolQualifiedLocator((line, line), symbol, lambda_type)
 
-	def profile(self, factors, measures):
-		data = collections.defaultdict(lambda: collections.defaultdict(list))
-		for m_typ, m_id, m_route in measures:
-			profile_data = m_route / self.name / 'profile.pickle'
+	def _profile_partitions(self, routes):
+		# Select a partition count that limits the merged data to
+		# the size of the largest measurement.
+		sizes = []
+		for x in routes:
 			try:
-				with profile_data.fs_open('rb') as f:
-					profile = pickle.load(f)
-			except EOFError:
-				continue
+				sizes.append(os.stat(x).st_size)
+			except FileNotFoundError:
+				pass
+
+		largest = max(sizes, default=0)
+		if not largest:
+			return 1
+
+		return max(1, min(self.partitions, -(-sum(sizes) // largest)))
+
+	def profile(self, factors, measures):
+		"""
+		# Aggregate the profile data of the &measures by path.
+
+		# Measurements are read in parallel. When the data is split into more than one
+		# partition, each measurement is read once and its partitions are written to
+		# temporary files using &spill_profile. The partitions are then merged one at a time
+		# so that the memory used is limited to the aggregate of a single partition
+		# in addition to the measurements being read.
+		"""
+		routes = [str(m_route / self.name / 'profile.pickle') for m_typ, m_id, m_route in measures]
+		partitions = self._profile_partitions(routes)
+
+		with contextlib.ExitStack() as stack:
+			executor, size = stack.enter_context(source.pool(self.workers, len(routes)))
+
+			if partitions == 1:
+				selections = [routes]
+			else:
+				spill = stack.enter_context(tempfile.TemporaryDirectory())
+				prefixes = [os.path.join(spill, str(i) + '.') for i in range(len(routes))]
+				writer = functools.partial(spill_profile, partitions=partitions)
+
+				selections = [[] for i in range(partitions)]
+				jobs = zip(routes, prefixes)
+				for prefix, written in zip(prefixes, window(executor, writer, jobs, size)):
+					for index in written:
+						selections[index].append(prefix + str(index))
+
+			for selection in selections:
+				data = collections.defaultdict(lambda: collections.defaultdict(list))
 
-			for (caller, call), times in profile.items():
-				path, sql = self.abstract_call_selector(call)
-				if caller is not None:
-					caller = self.abstract_call_selector(caller)
-				data[path][(caller, (path, sql))].extend(times)
+				for profile in window(executor, load_profile, selection, size):
+					for (caller, call), times in profile.items():
+						path, sql = self.abstract_call_selector(call)
+						if caller is not None:
+							caller = self.abstract_call_selector(caller)
+						data[path][(caller, (path, sql))].extend(times)
 
-		yield from data.items()
+				yield from data.items()
+				del data
 
 	def counters(self, factors, measures):
+		"""
+		# Produce the counters of the &measures. Measurements are read in parallel
+		# and the counters of each are produced in the order of &measures.
+		"""
+		routes = [m_route / self.name for m_typ, m_id, m_route in measures]
+		files = [str(x / 'coverage.counters') for x in routes]
+
+		with source.pool(self.workers, len(routes)) as (executor, size):
+			for route, data in zip(routes, window(executor, load_counters, files, size)):
+				if data is None:
+					# Measures emitted before the binary format was introduced.
+					yield from self._counters_pickle(route / 'coverage.pickle')
+					continue
+
+				for path, areas, counts in data:
+					yield path, list(zip(counters.quads(areas), counts))
+
+	def index(self, factors, measures):
+		"""
+		# Construct the test to area index of the &measures.
+		# Tests are identified by the measure identifier.
+		"""
+		idx = counters.Index()
+
 		for m_typ, m_id, m_route in measures:
-			coverage_data = m_route / self.name / 'coverage.pickle'
 			try:
-				with coverage_data.fs_open('rb') as f:
-					coverage = pickle.load(f)
-			except EOFError:
-				# Likely empty file.
+				r = counters.Reader.open(str(m_route / self.name / 'coverage.counters'))
+			except FileNotFoundError:
 				continue
 
-			for path, counters in coverage.items():
-				yield path, [(k, v) for k,v in counters.items()]
+			with r:
+				idx.add(m_id, [
+					(path, area)
+					for path, areas, counts in r.select()
+					for area in counters.quads(areas)
+				])
+
+		return idx
+
+	@staticmethod
+	def _counters_pickle(coverage_data):
+		try:
+			with coverage_data.fs_open('rb') as f:
+				coverage = pickle.load(f)
+		except (EOFError, FileNotFoundError):
+			# Likely empty file.
+			return
+
+		for path, counters in coverage.items():
+			yield path, [(k, v) for k,v in counters.items()]
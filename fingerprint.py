@@ -0,0 +1,140 @@
+"""
+# Content digests of source files memoized by their status.
+
+# &Index associates the device, inode, size, and modification time of a file with the
+# digest of its bytes. The index is stored using &cache so that files unchanged since
+# a previous build are neither read nor hashed.
+
+# Files modified within &racy seconds of being fingerprinted are hashed but not noted
+# as a later modification may not change the recorded status.
+
+# [ Properties ]
+# /algorithm/
+	# The default &hashlib algorithm used to digest files.
+# /racy/
+	# The number of seconds that a file's modification time must precede
+	# the current time for its digest to be noted.
+"""
+import os
+import mmap
+import time
+import hashlib
+
+from . import cache
+
+algorithm = 'blake2b'
+racy = 2.0
+
+def digest(path:str, algorithm:str=algorithm) -> str:
+	"""
+	# Hash the contents of the file at &path using the named &hashlib &algorithm.
+	"""
+	h = hashlib.new(algorithm)
+
+	with open(path, 'rb') as f:
+		try:
+			with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+				h.update(m)
+		except ValueError:
+			# Empty file.
+			pass
+
+	return h.hexdigest()
+
+def status(st) -> tuple:
+	"""
+	# Construct the index key of the &os.stat_result, &st.
+	"""
+	return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+class Index(object):
+	"""
+	# Persistent mapping of file status to content digests.
+
+	# [ Properties ]
+	# /algorithm/
+		# The &hashlib algorithm used to digest files.
+	# /namespace/
+		# The &cache namespace that the index is stored in.
+	# /limit/
+		# The number of entries retained when the index is saved; entries
+		# not used since the index was loaded are discarded first.
+	# /noted/
+		# The number of digests noted since the index was last saved.
+	"""
+
+	def __init__(self, algorithm:str=algorithm, namespace:str='fingerprints', limit:int=1024*64):
+		self.algorithm = algorithm
+		self.namespace = namespace
+		self.limit = limit
+
+		self._digests = None
+		self._used = {}
+		self.noted = 0
+
+	def _key(self):
+		return 'index-' + self.algorithm
+
+	def load(self):
+		"""
+		# Read the stored index; entries noted in the current process are preserved.
+		"""
+		data = cache.load(self.namespace, self._key())
+		if not isinstance(data, dict):
+			data = {}
+
+		data.update(self._used)
+		self._digests = data
+
+	def fingerprint(self, path:str) -> str:
+		"""
+		# Identify the digest of the file at &path using the noted digest when
+		# the status of the file has not changed.
+		"""
+		if self._digests is None:
+			self.load()
+
+		st = os.stat(path)
+		key = status(st)
+
+		try:
+			d = self._digests[key]
+		except KeyError:
+			d = digest(path, self.algorithm)
+			if time.time() - (st.st_mtime_ns / 1000000000) < racy:
+				return d
+
+			self._digests[key] = d
+			self.noted += 1
+
+		self._used[key] = d
+		return d
+
+	def save(self) -> bool:
+		"""
+		# Store the index when new digests were noted. Entries stored by other
+		# processes since the index was loaded are merged.
+		"""
+		if not self.noted:
+			return True
+
+		self.load()
+		data = self._digests
+		if len(data) > self.limit:
+			data = dict(self._used)
+			for k, v in self._digests.items():
+				if len(data) >= self.limit:
+					break
+				data.setdefault(k, v)
+
+		if cache.store(self.namespace, self._key(), data):
+			self.noted = 0
+			return True
+
+		return False
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.save()
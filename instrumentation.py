@@ -1,5 +1,11 @@
 """
 # AST manipulations for injecting coverage counters into Python source.
+
+# [ Properties ]
+# /area_limit/
+	# The maximum number of bytes used by the area tables recorded by &store_areas.
+# /area_prune_frequency/
+	# The number of recorded tables between the pruning of the `areas` namespace.
 """
 import ast
 import builtins
@@ -7,6 +13,11 @@ import functools
 
 from . import module
 from . import source
+from . import cache
+
+area_limit = 1024*1024*64
+area_prune_frequency = 64
+_area_stores = 0
 
 BranchNodes = (
 	ast.BoolOp,
@@ -201,6 +212,44 @@ def delineate(noded):
 
 	return area
 
+def identify(noded):
+	"""
+	# Identify the type of the counter being instrumented for &noded.
+	"""
+	node, parent = noded[0:2]
+	if isinstance(node, (ast.Str, ast.Name)):
+		return '%s[%s]' %(parent.__class__.__name__, node.__class__.__name__)
+	return node.__class__.__name__
+
+def area_key(hash):
+	"""
+	# Construct the cache key for the area table of the source identified by &hash.
+	"""
+	return hash + '-' + str(source.revision)
+
+def load_areas(hash):
+	"""
+	# Retrieve the area table recorded by &compile for the source identified by &hash.
+	# Returns &None if no table was recorded.
+	"""
+	return cache.load('areas', area_key(hash))
+
+def store_areas(hash, table) -> bool:
+	"""
+	# Record the area &table of the source identified by &hash for &load_areas.
+	# Returns &False when the table could not be stored.
+	"""
+	global _area_stores
+
+	if not cache.store('areas', area_key(hash), table):
+		return False
+
+	_area_stores += 1
+	if _area_stores % area_prune_frequency == 0:
+		cache.prune('areas', area_limit)
+
+	return True
+
 def apply(path, noded):
 	node = noded[0]
 	if hasattr(node, '_f_context'):
@@ -211,14 +260,25 @@ def apply(path, noded):
 	return instrument(path, noded, area)
 
 def compile(factor, source, path, constants,
-		parse=source.parse,
+		parse=source.shared.parse,
 		hash=module.hash_syntax,
-		filter=visit
+		filter=visit,
+		store=None,
+		detach=source.detach,
 	):
 	"""
 	# Compile Python source of a module into an instrumented &types.CodeObject
+
+	# When &store is given, usually &store_areas, the areas and types of the instrumented
+	# nodes are recorded so that coverage projections can be performed without parsing
+	# the source. Sources delineated in advance by &source.prime are not delineated again.
+
+	# The digest of the source is computed once by &hash and given to &parse, a
+	# &source.Cache.parse method, as its key.
 	"""
-	srclines, tree, nodes = parse(source, path, filter=visit)
+	digest = hash(source)
+	srclines, tree, nodes = parse(source, path, filter=visit, digest=digest)
+	table = []
 
 	for noded in nodes:
 		if not hasattr(noded[0], '_f_area'):
@@ -226,10 +286,18 @@ def compile(factor, source, path, constants,
 		if isinstance(noded[0], (ast.expr_context, ast.slice)):
 			continue
 
-		apply(path, noded)
+		area = delineate(noded)
+		table.append(((area[0], area[1]+1, area[2], area[3]), identify(noded)))
+		instrument(path, noded, area)
+
+	if store is not None:
+		store(digest, table)
+
+	# Areas are no longer needed and would be serialized with the tree.
+	detach(tree)
 
 	# Add timestamp and factor id.
-	module.inject(tree, factor, hash(source), constants)
+	module.inject(tree, factor, digest, constants)
 	tree.body[0:0] = construct_initialization_nodes().body
 
 	return tree
@@ -240,8 +308,7 @@ if __name__ == '__main__':
 	import os
 	out, src = sys.argv[1:]
 
-	st = os.stat(src)
 	with open(src) as f:
-		co = compile(None, f.read(), src, (), filter=visit)
-
-	bytecode.store(out, co, st.st_mtime, st.st_size)
+		tree = compile(None, f.read(), src, (), filter=visit)
+		co = builtins.compile(tree, src, 'exec')
+		bytecode.store('time', out, co, f.fileno(), None)
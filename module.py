@@ -6,19 +6,33 @@ import builtins
 import typing
 import hashlib
 import io
+import sys
+import array
+import itertools
+import collections
 import codecs
+import marshal
 
 constant_expression = "%s = %r"
 
+# AST unit serialization.
+unit_magic = b'FPAU'
+unit_version = 1
+
 def hash_syntax(source, encoding='utf-8', hi=hashlib.sha3_256, hash_chunks=1024*4):
+	"""
+	# Identify the &source by the digest of its encoded form.
+	# The source is encoded &hash_chunks characters at a time.
+	"""
 	h = hi()
 	memory = io.BytesIO()
 	sw = codecs.getwriter(encoding)(memory)
 
 	for i in range(0, len(source), hash_chunks):
 		sw.write(source[i:i+hash_chunks])
+		h.update(memory.getvalue())
+		# Discard the encoded chunk.
 		memory.seek(0)
-		h.update(memory.read())
 		memory.truncate()
 	return h.hexdigest()
 
@@ -54,3 +68,228 @@ def compile(factor, source, path, constants):
 	tree = ast.parse(source, path)
 	inject(tree, factor, hash_syntax(source), constants)
 	return tree
+
+def strip_docstrings(tree:ast.AST) -> ast.AST:
+	"""
+	# Remove the docstrings of the module, classes, and functions in &tree.
+	# Bodies consisting of only a docstring are given a `pass` statement.
+	"""
+	scopes = (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+
+	for node in ast.walk(tree):
+		if not isinstance(node, scopes) or not node.body:
+			continue
+
+		first = node.body[0]
+		if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) \
+				and isinstance(first.value.value, str):
+			if len(node.body) > 1 or isinstance(node, ast.Module):
+				del node.body[0]
+			else:
+				node.body[0] = ast.copy_location(ast.Pass(), first)
+
+	return tree
+
+def _varint(value, data):
+	while value >= 64:
+		data.append(0x40 | (value & 63))
+		value >>= 6
+	data.append(value)
+
+def _line_table(code) -> bytes:
+	# Construct a location table of &code having line numbers without columns.
+	# Entries cover at most eight code units and use the "no columns" form, 13,
+	# holding a signed line delta, or the "no location" form, 15.
+	data = bytearray()
+	units = [p[0] for p in code.co_positions()]
+	line = code.co_firstlineno
+
+	for start, run in itertools.groupby(units):
+		count = len(list(run))
+		while count:
+			n = min(count, 8)
+			count -= n
+			if start is None:
+				data.append(0x80 | (15 << 3) | (n - 1))
+			else:
+				data.append(0x80 | (13 << 3) | (n - 1))
+				delta = start - line
+				_varint(((-delta) << 1) | 1 if delta < 0 else delta << 1, data)
+				line = start
+
+	return bytes(data)
+
+def strip_columns(code):
+	"""
+	# Remove the column positions from the location tables of &code and its nested
+	# code objects leaving the line numbers used by tracebacks.
+	# Requires Python 3.11 or greater; &code is returned unmodified otherwise.
+	"""
+	if not hasattr(code, 'co_positions'):
+		return code
+
+	CodeType = code.__class__
+	return code.replace(
+		co_consts=tuple(strip_columns(c) if isinstance(c, CodeType) else c for c in code.co_consts),
+		co_linetable=_line_table(code),
+	)
+
+# Location column value of absent attributes.
+_unit_absent = -0x80000000
+
+def _unit_table(tree):
+	# Construct the node table of &tree.
+	types = {}
+	indexes = {}
+	order = []
+
+	kinds = array.array('H')
+	locations = array.array('i')
+	nodes = array.array('I')
+	sequences = array.array('I')
+	values = []
+	AST = ast.AST
+
+	def index(node):
+		i = indexes.get(id(node))
+		if i is None:
+			i = indexes[id(node)] = len(order)
+			order.append(node)
+		return i
+
+	index(tree)
+
+	# Nodes are stored in index order as &order grows during the iteration.
+	# The root is never referenced, so zero identifies &None in sequences.
+	for node in order:
+		Class = node.__class__
+		kinds.append(types.setdefault(Class.__name__, len(types)))
+		d = node.__dict__
+
+		for x in Class._attributes:
+			v = d.get(x)
+			locations.append(_unit_absent if v is None else v)
+
+		for x in Class._fields:
+			v = d.get(x)
+			if isinstance(v, AST):
+				nodes.append(len(values))
+				v = index(v)
+			elif v.__class__ is list and v and any(isinstance(y, AST) for y in v):
+				sequences.append(len(values))
+				v = [0 if y is None else index(y) for y in v]
+			values.append(v)
+
+	return (
+		tuple(types),
+		kinds.tobytes(),
+		locations.tobytes(),
+		nodes.tobytes(),
+		sequences.tobytes(),
+		values,
+	)
+
+def _unit_tree(order, table,
+		chain=itertools.chain.from_iterable,
+		repeat=itertools.repeat,
+		deque=collections.deque,
+	):
+	# Construct the tree of the node &table.
+	types, *columns, values = table
+
+	for i, typecode in enumerate('HiII'):
+		a = array.array(typecode)
+		a.frombytes(columns[i])
+		if order != sys.byteorder:
+			a.byteswap()
+		columns[i] = a
+	kinds, locations, references, sequences = columns
+
+	# Construction is performed by iterators to avoid evaluating each node.
+	classes = [getattr(ast, x) for x in types]
+	fields = [x._fields for x in classes]
+	attributes = [x._attributes for x in classes]
+	nodes = list(map(ast.AST.__new__, map(classes.__getitem__, kinds)))
+
+	lookup = list(nodes)
+	lookup[0] = None
+	get = lookup.__getitem__
+	deque(map(values.__setitem__, references, map(get, map(values.__getitem__, references))), 0)
+	deque(map(values.__setitem__, sequences,
+		map(list, map(map, repeat(get), map(values.__getitem__, sequences)))), 0)
+
+	def assign(names, values):
+		counts = map(len, map(names.__getitem__, kinds))
+		targets = chain(map(repeat, nodes, counts))
+		deque(map(setattr, targets, chain(map(names.__getitem__, kinds)), values), 0)
+
+	assign(fields, values)
+	assign(attributes, locations)
+
+	if _unit_absent in locations:
+		for node in nodes:
+			d = node.__dict__
+			for x in node._attributes:
+				if d.get(x) == _unit_absent:
+					del d[x]
+
+	return nodes[0]
+
+def dump_unit(origin:str, tree:ast.AST=None, code=None, optimize:int=None) -> bytes:
+	"""
+	# Serialize the unit identified by &origin holding the &tree of the module
+	# and, when no further transformations are pending, the &code compiled
+	# from it at the &optimize level.
+
+	# Nodes are stored in a flat table referring to other nodes by index; shared nodes,
+	# such as expression contexts, are stored once. The types and locations of the nodes
+	# are stored as packed columns, the field values as a single sequence, and the positions
+	# of the values referring to nodes as columns. Attributes other than the node's
+	# fields and locations are not stored.
+	"""
+	return unit_magic + marshal.dumps((
+		unit_version,
+		sys.version_info[:2],
+		sys.byteorder,
+		origin,
+		optimize,
+		code,
+		None if tree is None else _unit_table(tree),
+	))
+
+def _read_unit(data):
+	if data[:len(unit_magic)] != unit_magic:
+		raise ValueError("not an AST unit")
+
+	unit = marshal.loads(memoryview(data)[len(unit_magic):])
+	if unit[0] != unit_version or tuple(unit[1]) != sys.version_info[:2]:
+		raise ValueError("unsupported AST unit version: " + repr(unit[:2]))
+
+	return unit[2:]
+
+def load_unit(data:bytes):
+	"""
+	# Construct the `(origin, tree)` pair of the unit serialized by &dump_unit.
+	"""
+	order, origin, optimize, code, table = _read_unit(data)
+	if table is None:
+		raise ValueError("unit does not contain a tree")
+
+	return origin, _unit_tree(order, table)
+
+def load_unit_origin(data:bytes) -> str:
+	"""
+	# Retrieve the origin of the unit serialized by &dump_unit.
+	"""
+	return _read_unit(data)[1]
+
+def load_unit_code(data:bytes, optimize:int):
+	"""
+	# Retrieve the `(origin, code)` pair of the unit serialized by &dump_unit.
+	# Returns &None when the unit has no code compiled at the &optimize level.
+	"""
+	order, origin, uoptimize, code, table = _read_unit(data)
+	if code is None or uoptimize != optimize:
+		return None
+
+	return origin, code
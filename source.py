@@ -1,14 +1,27 @@
 """
 # Python source (AST) processing tools.
 """
+import os
+import sys
 import ast
+import array
+import bisect
+import marshal
 import tokenize
 import itertools
 import collections
 import functools
 import builtins
+import contextlib
 
 from . import module
+from . import cache
+
+# Whether the AST records end positions; used by &parse to avoid tokenization.
+native_positions = sys.version_info >= (3, 8)
+
+# Revision of the areas produced by &parse; qualifies persisted area data.
+revision = 2 if native_positions else 1
 
 # Tokens skipped to identify the end of an AST node.
 insignificant = set([
@@ -75,8 +88,17 @@ def bottom(tree, listdir=shallow, Queue=collections.deque):
 def node_set_address(node, address):
 	"""
 	# Set the `lineno` and `col_offset` attributes on the &node.
+	# The end position is set to the same address so that the synthetic, negative,
+	# addresses used by instrumentation are accepted by the compiler.
+
+	# Nodes without locations, such as the expression contexts shared by all trees,
+	# are not modified.
 	"""
+	if 'lineno' not in node._attributes:
+		return
+
 	node.lineno, node.col_offset = address
+	node.end_lineno, node.end_col_offset = address
 
 def node_remove_docstring(container):
 	"""
@@ -99,23 +121,18 @@ def node_remove_docstring(container):
 	assert container.body[0].value.s == container.docstring
 	del container.body[0]
 
-def associate_siblings(following, nodes,
+def _sibling_records(following, nodes,
 		iterate=ast.iter_child_nodes,
 		chain=itertools.chain,
 		list=list,
 		isinstance=isinstance,
-		hasattr=hasattr,
 		getattr=getattr
 	):
-	"""
-	# Associate the child nodes of &nodes with their following
-	# sibling taking care to communicate the parent's following
-	# sibling for the final child.
-
-	# &following can be &None if the node is at the end of the document.
-	"""
-
+	# Identify the following sibling of each of the child nodes of &nodes.
 	immediate = list(iterate(nodes))
+	if not immediate:
+		return iter(())
+
 	n_map = collections.defaultdict(list)
 	for node in immediate:
 		ln = getattr(node, 'lineno', None)
@@ -144,27 +161,201 @@ def associate_siblings(following, nodes,
 	# Update each record noting the following sibling.
 	s1 = zip(positions[0::2], positions[1::2])
 	s2 = zip(positions[1::2], positions[2::2])
-	for subject, follows in chain(s1, s2):
-		for lnode in n_map[subject]:
+	return iter([
+		(subject, lnode, follows)
+		for subject, follows in chain(s1, s2)
+		for lnode in n_map[subject]
+	])
+
+def fix_missing_locations(tree, iterate=ast.iter_child_nodes, getattr=getattr):
+	"""
+	# &ast.fix_missing_locations implementation using an explicit stack
+	# in order to support deeply nested trees.
+	"""
+	stack = [(tree, (1, 0, 1, 0))]
+	push = stack.append
+	pop = stack.pop
+
+	while stack:
+		node, (lineno, col_offset, end_lineno, end_col_offset) = pop()
+		attrs = node._attributes
+
+		if 'lineno' in attrs:
+			if not hasattr(node, 'lineno'):
+				node.lineno = lineno
+			else:
+				lineno = node.lineno
+		if 'end_lineno' in attrs:
+			if getattr(node, 'end_lineno', None) is None:
+				node.end_lineno = end_lineno
+			else:
+				end_lineno = node.end_lineno
+		if 'col_offset' in attrs:
+			if not hasattr(node, 'col_offset'):
+				node.col_offset = col_offset
+			else:
+				col_offset = node.col_offset
+		if 'end_col_offset' in attrs:
+			if getattr(node, 'end_col_offset', None) is None:
+				node.end_col_offset = end_col_offset
+			else:
+				end_col_offset = node.end_col_offset
+
+		location = (lineno, col_offset, end_lineno, end_col_offset)
+		for child in iterate(node):
+			push((child, location))
+
+	return tree
+
+def associate_siblings(following, nodes, records=_sibling_records):
+	"""
+	# Associate the child nodes of &nodes with their following
+	# sibling taking care to communicate the parent's following
+	# sibling for the final child.
+
+	# &following can be &None if the node is at the end of the document.
+
+	# The tree is traversed depth first using an explicit stack so that
+	# deeply nested trees do not exhaust the recursion limit.
+	"""
+
+	stack = [records(following, nodes)]
+	push = stack.append
+	pop = stack.pop
+
+	while stack:
+		for subject, lnode, follows in stack[-1]:
 			yield (subject, (lnode, follows))
-			yield from associate_siblings(follows, lnode)
+			push(records(follows, lnode))
+			break
+		else:
+			pop()
+
+def _pack(position):
+	# Columns are offset so that the doc-string address, `-1`, packs as zero.
+	return (position[0] << 32) | (position[1] + 1)
+
+class TokenIndex(object):
+	"""
+	# Index of token start positions supporting the lookups of a dictionary keyed
+	# by start address and producing the index of the first token at the address.
+
+	# Starts are stored as a sorted column of packed positions and located using
+	# a binary search. String tokens have additional addresses for possible doc-strings:
+	# the line of their end with a column of `-1`, and their start with the column
+	# incremented. These take precedence over token starts.
+	"""
+
+	__slots__ = ('starts', 'keys', 'values')
+
+	def __init__(self, tokens, STRING=tokenize.STRING):
+		self.starts = array.array('Q', [_pack(t.start) for t in tokens])
+
+		extra = []
+		for i, t in enumerate(tokens):
+			if t.type == STRING:
+				extra.append((_pack((t.end[0], -1)), i))
+				extra.append((_pack((t.start[0], t.start[1]+1)), i))
+		extra.sort()
+
+		self.keys = array.array('Q', [x[0] for x in extra])
+		self.values = array.array('I', [x[1] for x in extra])
+
+	def get(self, address, default=None, bisect_left=bisect.bisect_left, bisect_right=bisect.bisect_right):
+		"""
+		# Identify the index of the token at &address.
+		"""
+		k = _pack(address)
+
+		keys = self.keys
+		if keys:
+			# Last assignment wins.
+			i = bisect_right(keys, k) - 1
+			if i >= 0 and keys[i] == k:
+				return self.values[i]
+
+		starts = self.starts
+		i = bisect_left(starts, k)
+		if i < len(starts) and starts[i] == k:
+			return i
+
+		return default
+
+	def __contains__(self, address):
+		return self.get(address) is not None
+
+	def __getitem__(self, address):
+		i = self.get(address)
+		if i is None:
+			raise KeyError(address)
+		return i
 
 def map_tokens(tokens, STRING=tokenize.STRING):
 	"""
-	# Construct a dictionary associating start addresses with their corresponding token.
+	# Construct a &TokenIndex associating start addresses with their corresponding token.
+	"""
+	return TokenIndex(tokens, STRING=STRING)
+
+class TokenWindow(object):
+	"""
+	# A view of a range of a token list.
+
+	# Windows support the subset of list operations used by the delineation
+	# functions: indexing, iteration, and deletion of leading or trailing tokens.
+	# Deleting tokens narrows the window without modifying the underlying list.
 	"""
 
-	token_map = {}
-	for i in range(len(tokens)):
-		t = tokens[i]
-		if t.start not in token_map:
-			token_map[t.start] = i
-		if t.type == STRING:
-			# Additional address for possible doc-strings.
-			token_map[(t.end[0], -1)] = i
-			token_map[(t.start[0], t.start[1]+1)] = i
+	__slots__ = ('tokens', 'start', 'stop')
+
+	def __init__(self, tokens, start=0, stop=None):
+		if stop is None or stop > len(tokens):
+			stop = len(tokens)
+		self.tokens = tokens
+		self.start = start
+		self.stop = max(start, stop)
+
+	def __len__(self):
+		return self.stop - self.start
+
+	def _offset(self, index):
+		n = self.stop - self.start
+		if index < 0:
+			index += n
+		if index < 0 or index >= n:
+			raise IndexError("token window index out of range")
+		return self.start + index
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(self.stop - self.start)
+			if step != 1:
+				raise ValueError("token windows only support contiguous slices")
+			return self.__class__(self.tokens, self.start + start, self.start + max(start, stop))
+
+		return self.tokens[self._offset(index)]
+
+	def __delitem__(self, index):
+		if not isinstance(index, slice):
+			raise TypeError("only leading or trailing tokens can be removed from a window")
+
+		start, stop, step = index.indices(self.stop - self.start)
+		if step != 1:
+			raise ValueError("token windows only support contiguous slices")
+		if stop <= start:
+			return
+
+		if start == 0:
+			self.start += min(stop, self.stop - self.start)
+		elif stop == self.stop - self.start:
+			self.stop = self.start + start
+		else:
+			raise ValueError("only leading or trailing tokens can be removed from a window")
+
+	def __iter__(self):
+		return map(self.tokens.__getitem__, range(self.start, self.stop))
 
-	return token_map
+	def __reversed__(self):
+		return map(self.tokens.__getitem__, range(self.stop - 1, self.start - 1, -1))
 
 def count_trailing_insignificant(tokens, OP=tokenize.OP, NAME=tokenize.NAME):
 	count = 0
@@ -197,7 +388,7 @@ def identify_boundary(tokens, start, end, OP=tokenize.OP, NAME=tokenize.NAME):
 	# identified following sibling, &associate_siblings.
 	"""
 	# Extract window from following sibling address.
-	l = list(tokens[start:end])
+	l = TokenWindow(tokens, start, end)
 	n_tokens = len(l)
 
 	# Trim whitespace from list.
@@ -373,7 +564,7 @@ def areas(token_map, tokens, context, node, address, following):
 		t = tokens[start]
 		yield node, t.start, t.end
 	elif isinstance(node, chain_classes):
-		scope = tokens[start:stop]
+		scope = TokenWindow(tokens, start, stop)
 		for x in chain(scope, context, node, address, following):
 			yield x[0], x[1][2], x[1][3]
 	else:
@@ -438,8 +629,8 @@ def join(lookup, nodes):
 
 		yield node_desc
 
-def _prepare(nodes, tokens, filter=bottom, identify=_lookup_region):
-	# Note the syntax area of the nodes in the AST.
+def _lookup(nodes, tokens, identify=_lookup_region):
+	# Construct the region lookup function used by &join.
 	tmap = map_tokens(tokens)
 
 	sa = {}
@@ -452,23 +643,673 @@ def _prepare(nodes, tokens, filter=bottom, identify=_lookup_region):
 		if hasattr(node, 'lineno'):
 			d[(node.lineno, node.col_offset)].append(node)
 
-	lookup = functools.partial(_lookup_region, sa, d, tokens, tmap)
-	yield from join(lookup, filter(nodes))
+	return functools.partial(identify, sa, d, tokens, tmap)
+
+def _prepare(nodes, tokens, filter=bottom, identify=_lookup_region):
+	# Note the syntax area of the nodes in the AST.
+	yield from join(_lookup(nodes, tokens, identify=identify), filter(nodes))
+
+def _once(nodes, hasattr=hasattr, id=id):
+	# Produce delineated nodes only once; like &join, nodes are not produced again
+	# when the tree is modified during iteration in a way that revisits them.
+	seen = set()
+	add = seen.add
+
+	for node_desc in nodes:
+		node = node_desc[0]
+		if hasattr(node, '_f_area'):
+			i = id(node)
+			if i in seen:
+				continue
+			add(i)
+		yield node_desc
+
+def _extent(node):
+	# Area containing the located descendants of &node.
+	areas = [x._f_area for x in ast.walk(node) if hasattr(x, '_f_area')]
+	if not areas:
+		return None
+
+	return min(x[:2] for x in areas) + max(x[2:] for x in areas)
+
+def _delineate(nodes, sourcelines, filter=bottom, isinstance=isinstance, getattr=getattr):
+	# Note the syntax area of the nodes in the AST using their end positions.
+	contexts = collections.defaultdict(list)
+
+	for node in ast.walk(nodes):
+		end = getattr(node, 'end_lineno', None)
+		if end is None or getattr(node, 'lineno', None) is None:
+			continue
+
+		start = (node.lineno, node.col_offset)
+		node._f_area = start + (end, node.end_col_offset)
+		if isinstance(node, chain_classes):
+			contexts[start].append(node)
+
+	# Chains of nodes identified by the same address.
+	for ctx in contexts.values():
+		if len(ctx) < 2:
+			continue
+
+		ctx.sort(key=(lambda x: x._f_area[2:]))
+		f_context = [x._f_area for x in ctx]
+		for i, x in enumerate(ctx):
+			x._f_context = f_context
+			x._f_index = i
+
+	lookup = None
+	for node_desc in _once(filter(nodes)):
+		node = node_desc[0]
+
+		if not hasattr(node, '_f_area') and isinstance(node, ast.AST):
+			if getattr(node, 'lineno', None) is None:
+				# Arguments, with items, and comprehensions; use the extent of the contents.
+				area = _extent(node)
+				if area is not None:
+					node._f_area = area
+			else:
+				# Fallback to the token walker for nodes without end positions.
+				if lookup is None:
+					readline = iter(sourcelines).__next__
+					lookup = _lookup(nodes, list(tokenize.tokenize(readline)))
+				yield from join(lookup, (node_desc,))
+				continue
+
+		yield node_desc
 
-def parse(source:str, path:str, filter=bottom, encoding='utf-8'):
+def parse(source:str, path:str, filter=bottom, encoding='utf-8', positions=native_positions):
 	"""
 	# Parse the given &source creating an &ast.Module whose child nodes have their exact areas
 	# assigned to the `_f_area` attribute.
+
+	# When &positions is true, the areas are derived from the end positions recorded
+	# by the parser and the source is only tokenized for nodes lacking them.
 	"""
 	nodes = ast.parse(source, path)
-	ast.fix_missing_locations(nodes)
+	fix_missing_locations(nodes)
 
 	sourcelines = source.encode(encoding).splitlines(True)
+	if positions:
+		return sourcelines, nodes, _delineate(nodes, sourcelines, filter=filter)
+
 	readline = iter(sourcelines).__next__
 	tokens = list(tokenize.tokenize(readline))
 
 	return sourcelines, nodes, _prepare(nodes, tokens, filter=filter)
 
+class AreaTable(object):
+	"""
+	# Area table of the nodes of a tree numbered in &ast.walk order.
+
+	# The start line, start column, end line, end column, and context identifier of each
+	# node are stored in `array('I')` columns. Nodes without areas have a start line of
+	# &missing, and nodes that are not in a chain context have a context identifier of zero.
+	# The members of each context are stored as node numbers in &contexts with
+	# the bounds of context `n` at `offsets[n-1]` and `offsets[n]`.
+
+	# [ Properties ]
+	# /columns/
+		# The start line, start column, end line, end column, and context columns.
+	# /contexts/
+		# The node numbers of the members of the contexts in context order.
+	# /offsets/
+		# The offsets of the contexts in &contexts.
+	# /tree/
+		# The tree given to &bind; &None when the table is not bound.
+	"""
+
+	missing = 0xFFFFFFFF
+	version = 1
+
+	def __init__(self, columns=None, contexts=None, offsets=None):
+		self.columns = columns or tuple(array.array('I') for i in range(5))
+		self.contexts = contexts if contexts is not None else array.array('I')
+		self.offsets = offsets if offsets is not None else array.array('I', (0,))
+		self.tree = None
+		self._numbers = None
+
+	def __len__(self):
+		return len(self.columns[0])
+
+	@classmethod
+	def from_tree(Class, tree):
+		"""
+		# Construct the table of the delineated &tree.
+		"""
+		t = Class()
+		sl, sc, el, ec, cx = t.columns
+		contexts = {}
+		missing = Class.missing
+
+		for i, node in enumerate(ast.walk(tree)):
+			area = getattr(node, '_f_area', None)
+			if area is None:
+				sl.append(missing)
+				sc.append(0)
+				el.append(0)
+				ec.append(0)
+				cx.append(0)
+				continue
+
+			sl.append(area[0])
+			sc.append(area[1])
+			el.append(area[2])
+			ec.append(area[3])
+
+			ctx = getattr(node, '_f_context', None)
+			if ctx is None:
+				cx.append(0)
+			else:
+				cid, members = contexts.setdefault(id(ctx), (len(contexts) + 1, []))
+				members.append((node._f_index, i))
+				cx.append(cid)
+
+		for cid, members in sorted(contexts.values(), key=(lambda x: x[0])):
+			members.sort()
+			t.contexts.extend(x[1] for x in members)
+			t.offsets.append(len(t.contexts))
+
+		return t
+
+	def area(self, number:int):
+		"""
+		# Retrieve the area of the node identified by &number; &None if it has no area.
+		"""
+		sl, sc, el, ec, cx = self.columns
+		if sl[number] == self.missing:
+			return None
+		return (sl[number], sc[number], el[number], ec[number])
+
+	def members(self, number:int):
+		"""
+		# Retrieve the numbers of the nodes in the context of the node identified by &number.
+		"""
+		cid = self.columns[4][number]
+		if not cid:
+			return None
+		return self.contexts[self.offsets[cid-1]:self.offsets[cid]]
+
+	def delineate(self, number:int):
+		"""
+		# Retrieve the area of the node identified by &number extended to
+		# the start of its context.
+		"""
+		area = self.area(number)
+		members = self.members(number)
+		if area is None or members is None:
+			return area
+
+		return self.area(members[0])[:2] + area[2:]
+
+	def bind(self, tree):
+		"""
+		# Construct a table sharing the columns of this table whose nodes
+		# are associated with the nodes of &tree for use with &select.
+		# The &tree is referenced by the new table so that the identities
+		# of its nodes remain valid.
+		"""
+		t = self.__class__(self.columns, self.contexts, self.offsets)
+		t._numbers = {id(x): i for i, x in enumerate(ast.walk(tree))}
+		t.tree = tree
+		return t
+
+	def select(self, node):
+		"""
+		# Retrieve the number of &node in the tree given to &bind.
+		"""
+		return self._numbers[id(node)]
+
+	def apply(self, tree):
+		"""
+		# Assign the `_f_area`, `_f_context`, and `_f_index` attributes to the nodes of &tree.
+		"""
+		cx = self.columns[4]
+		contexts = {}
+
+		for i, node in enumerate(ast.walk(tree)):
+			area = self.area(i)
+			if area is None:
+				continue
+			node._f_area = area
+
+			cid = cx[i]
+			if cid:
+				members = self.members(i)
+				try:
+					ctx = contexts[cid]
+				except KeyError:
+					ctx = contexts[cid] = [self.area(x) for x in members]
+				node._f_context = ctx
+				node._f_index = members.index(i)
+
+	def serialize(self) -> bytes:
+		"""
+		# Construct the marshalled form of the table.
+		"""
+		return marshal.dumps((
+			self.version, sys.byteorder,
+			[x.tobytes() for x in self.columns],
+			self.contexts.tobytes(),
+			self.offsets.tobytes(),
+		))
+
+	@classmethod
+	def load(Class, data:bytes):
+		"""
+		# Construct a table from its &serialize form.
+		"""
+		tversion, order, columns, contexts, offsets = marshal.loads(data)
+		if tversion != Class.version:
+			raise ValueError("unsupported area table version: " + str(tversion))
+
+		def column(data):
+			a = array.array('I')
+			a.frombytes(data)
+			if order != sys.byteorder:
+				a.byteswap()
+			return a
+
+		return Class(tuple(map(column, columns)), column(contexts), column(offsets))
+
+def detach(tree):
+	"""
+	# Remove the area attributes assigned by &parse from the nodes of &tree.
+	"""
+	for node in ast.walk(tree):
+		d = node.__dict__
+		d.pop('_f_area', None)
+		d.pop('_f_context', None)
+		d.pop('_f_index', None)
+
+class Delineation(object):
+	"""
+	# Delineated source retained for incremental updates by &update.
+
+	# [ Properties ]
+	# /sourcelines/
+		# The encoded lines of the source.
+	# /tree/
+		# The &ast.Module whose nodes have their areas assigned.
+	"""
+
+	__slots__ = ('sourcelines', 'tree')
+
+	def __init__(self, sourcelines, tree):
+		self.sourcelines = sourcelines
+		self.tree = tree
+
+	def select(self, filter=bottom):
+		"""
+		# Iterate over the nodes selected by &filter.
+		"""
+		return _once(filter(self.tree))
+
+	def table(self) -> AreaTable:
+		"""
+		# Construct the &AreaTable of the tree.
+		"""
+		return AreaTable.from_tree(self.tree)
+
+def delineate(source:str, path:str, encoding='utf-8') -> Delineation:
+	"""
+	# Parse the &source and assign the areas of all of its nodes.
+	"""
+	sourcelines, nodes, prepared = parse(source, path, encoding=encoding)
+	for x in prepared:
+		pass
+
+	return Delineation(sourcelines, nodes)
+
+def _statement_span(stmt):
+	# Lines of a top-level statement including its decorators.
+	start = stmt.lineno
+	for d in getattr(stmt, 'decorator_list', ()):
+		if d.lineno < start:
+			start = d.lineno
+
+	return start, stmt.end_lineno
+
+def _shift(statements, delta):
+	# Adjust the lines of the nodes and areas in &statements by &delta.
+	contexts = set()
+
+	for stmt in statements:
+		for node in ast.walk(stmt):
+			d = node.__dict__
+
+			if 'lineno' in d:
+				node.lineno += delta
+			if d.get('end_lineno') is not None:
+				node.end_lineno += delta
+
+			area = d.get('_f_area')
+			if area is not None:
+				node._f_area = (area[0]+delta, area[1], area[2]+delta, area[3])
+
+			ctx = d.get('_f_context')
+			if ctx is not None and id(ctx) not in contexts:
+				contexts.add(id(ctx))
+				ctx[:] = [(x[0]+delta, x[1], x[2]+delta, x[3]) for x in ctx]
+
+def update(previous:Delineation, source:str, path:str, encoding='utf-8') -> Delineation:
+	"""
+	# Delineate the &source, an edited form of the source of &previous, by parsing only
+	# the top-level statements whose lines changed. The nodes of the statements that
+	# follow the change are shifted to their new lines.
+
+	# The tree of &previous is reused by the returned &Delineation and must not be used
+	# after the update. When the changed statements cannot be parsed in isolation,
+	# the entire source is delineated.
+	"""
+	lines = source.encode(encoding).splitlines(True)
+	old = previous.sourcelines
+
+	# Identify the changed lines using the common prefix and suffix.
+	n = min(len(old), len(lines))
+	p = 0
+	while p < n and old[p] == lines[p]:
+		p += 1
+	s = 0
+	while s < n - p and old[-1-s] == lines[-1-s]:
+		s += 1
+
+	if p == len(old) == len(lines):
+		return Delineation(lines, previous.tree)
+
+	if p < 2:
+		# Possible encoding declaration.
+		return delineate(source, path, encoding=encoding)
+
+	delta = len(lines) - len(old)
+	start = p + 1
+	stop = max(len(old) - s, start - 1)
+
+	# Include the statement preceding the change as added lines may extend its body.
+	body = previous.tree.body
+	spans = [_statement_span(x) for x in body]
+	first = max(0, bisect.bisect_left([x[0] for x in spans], start) - 1)
+	last = bisect.bisect_right([x[0] for x in spans], stop)
+
+	if first < last:
+		rstart = min(start, spans[first][0])
+		rstop = max(stop, spans[last-1][1])
+	else:
+		rstart = start
+		rstop = stop
+
+	region = lines[rstart-1:rstop+delta]
+	try:
+		sub = ast.parse(b''.join(region).decode(encoding), path)
+	except SyntaxError:
+		return delineate(source, path, encoding=encoding)
+
+	fix_missing_locations(sub)
+	for x in _delineate(sub, region):
+		pass
+
+	_shift(sub.body, rstart - 1)
+	if delta:
+		_shift(body[last:], delta)
+
+	body[first:last] = sub.body
+	return Delineation(lines, previous.tree)
+
+class Cache(object):
+	"""
+	# Content addressed cache of the area tables produced by &parse.
+
+	# &AreaTable instances are keyed by the &module.hash_syntax digest of the source and kept
+	# in a process local LRU. When a &namespace is configured, tables are also
+	# stored using &cache and the namespace is pruned to &limit bytes.
+
+	# [ Properties ]
+	# /size/
+		# The number of tables kept in memory.
+	# /namespace/
+		# The &cache namespace used to store tables; &None to disable storage.
+	# /limit/
+		# The maximum number of bytes used by the stored tables.
+	"""
+
+	prune_frequency = 64
+
+	def __init__(self, size=128, namespace=None, limit=1024*1024*256):
+		self.size = size
+		self.namespace = namespace
+		self.limit = limit
+		self._tables = collections.OrderedDict()
+		self._stores = 0
+
+	@staticmethod
+	def key(source:str, digest:str=None) -> str:
+		"""
+		# Construct the cache key of &source. &digest, when given, is the
+		# &module.hash_syntax digest of &source and is used instead of hashing it.
+		"""
+		return '-'.join((
+			module.hash_syntax(source) if digest is None else digest,
+			str(revision),
+			sys.implementation.cache_tag or 'none',
+		))
+
+	def lookup(self, key:str):
+		"""
+		# Retrieve the table identified by &key from memory or storage.
+		"""
+		try:
+			self._tables.move_to_end(key)
+			return self._tables[key]
+		except KeyError:
+			pass
+
+		if self.namespace is None:
+			return None
+
+		data = cache.load(self.namespace, key)
+		if data is None:
+			return None
+
+		try:
+			table = AreaTable.load(data)
+		except (ValueError, TypeError):
+			return None
+
+		self.remember(key, table)
+		return table
+
+	def remember(self, key:str, table):
+		"""
+		# Keep the &table identified by &key in memory without storing it.
+		"""
+		self._tables[key] = table
+		while len(self._tables) > self.size:
+			self._tables.popitem(last=False)
+
+	def insert(self, key:str, table):
+		"""
+		# Remember the &table and store it if a namespace is configured.
+		"""
+		self.remember(key, table)
+		if self.namespace is None:
+			return
+
+		cache.store(self.namespace, key, table.serialize())
+		self._stores += 1
+		if self._stores % self.prune_frequency == 0:
+			cache.prune(self.namespace, self.limit)
+
+	def _load(self, source, path, encoding, digest=None):
+		key = self.key(source, digest)
+		table = self.lookup(key)
+
+		if table is None:
+			sourcelines, nodes, prepared = parse(source, path, encoding=encoding)
+			for x in prepared:
+				pass
+			table = AreaTable.from_tree(nodes)
+			self.insert(key, table)
+			return sourcelines, nodes, table, True
+		else:
+			nodes = ast.parse(source, path)
+			fix_missing_locations(nodes)
+			sourcelines = source.encode(encoding).splitlines(True)
+			return sourcelines, nodes, table, False
+
+	def parse(self, source:str, path:str, filter=bottom, encoding='utf-8', digest:str=None):
+		"""
+		# &parse the &source using the cached area table when available.
+		# &digest is passed to &key.
+
+		# Like &parse, the `_f_*` attributes are assigned to the nodes of the tree,
+		# including when the areas are restored from the table, and &detach is
+		# used to remove them. &table provides the areas without modifying the nodes.
+		"""
+		sourcelines, nodes, table, delineated = self._load(source, path, encoding, digest)
+		if not delineated:
+			table.apply(nodes)
+
+		return sourcelines, nodes, _once(filter(nodes))
+
+	def table(self, source:str, path:str, encoding='utf-8', digest:str=None):
+		"""
+		# Parse the &source and retrieve its &AreaTable bound to the tree.
+		# Unlike &parse, the areas are not assigned to the nodes.
+		"""
+		sourcelines, nodes, table, delineated = self._load(source, path, encoding, digest)
+		if delineated:
+			detach(nodes)
+
+		return sourcelines, nodes, table.bind(nodes)
+
+# Cache shared by the tools in the project. Tables are only kept in memory;
+# tools select a persistent namespace by constructing their own &Cache.
+shared = Cache()
+
+@contextlib.contextmanager
+def pool(workers:int=None, count:int=None):
+	"""
+	# Construct the process pool used with &window to perform &count calls
+	# and the number of calls to keep in flight.
+
+	# &None selects the CPU count. When there would be fewer than two &workers, or
+	# less than two calls, &None is produced so that the calls are performed
+	# in the current process.
+	"""
+	if workers is None:
+		workers = os.cpu_count() or 1
+	if count is not None:
+		workers = min(workers, count)
+
+	if workers < 2:
+		yield None, 1
+	else:
+		from concurrent import futures
+		with futures.ProcessPoolExecutor(max_workers=workers) as executor:
+			yield executor, workers * 2
+
+def window(executor, function, iterable, size:int, barrier=None):
+	"""
+	# Apply &function to the items of &iterable using &executor, producing
+	# the results in the order of &iterable. At most &size calls are in flight;
+	# &executor may be &None to apply the &function in the current process.
+
+	# The items are read and submitted by a separate thread so that each result
+	# is produced as soon as it and the results before it are available, even
+	# when reading the next item blocks. When &barrier is given and returns &True
+	# for an item, the calls submitted before the item complete before it is submitted.
+	"""
+	if executor is None:
+		yield from map(function, iterable)
+		return
+
+	import queue
+	import threading
+	from concurrent import futures
+
+	end = object()
+	submitted = queue.SimpleQueue()
+	slots = threading.Semaphore(size)
+	stop = threading.Event()
+
+	def acquire():
+		# Wait for a slot unless the consumer has stopped.
+		while not stop.is_set():
+			if slots.acquire(timeout=0.1):
+				return True
+		return False
+
+	def feed():
+		inflight = []
+		try:
+			for x in iterable:
+				if barrier is not None and barrier(x):
+					futures.wait(inflight)
+					inflight = []
+				if not acquire():
+					return
+
+				f = executor.submit(function, x)
+				inflight = [y for y in inflight if not y.done()]
+				inflight.append(f)
+				submitted.put(f)
+		except BaseException as err:
+			submitted.put(err)
+		submitted.put(end)
+
+	threading.Thread(target=feed, daemon=True).start()
+	try:
+		while True:
+			f = submitted.get()
+			if f is end:
+				break
+			if isinstance(f, BaseException):
+				raise f
+
+			result = f.result()
+			slots.release()
+			yield result
+	finally:
+		stop.set()
+
+def _table_file(job):
+	# Worker of &parse_files; the table is stored by the process' &shared cache.
+	path, encoding = job
+	with open(path, encoding=encoding) as f:
+		text = f.read()
+
+	key = shared.key(text)
+	table = shared.lookup(key)
+	if table is None:
+		sourcelines, nodes, table, delineated = shared._load(text, path, encoding)
+
+	return path, key, table.serialize()
+
+def parse_files(paths, workers:int=None, encoding='utf-8'):
+	"""
+	# Delineate the sources at &paths using a pool of &workers processes and produce
+	# `(path, key, table)` triples in the order of &paths; `key` is the &Cache.key of the
+	# source and `table` is the serialized &AreaTable.
+
+	# At most twice the number of &workers sources are in flight. &None selects the CPU count
+	# and `0` or `1` delineates the sources in the current process.
+	"""
+	jobs = [(str(x), encoding) for x in paths]
+
+	with pool(workers, len(jobs)) as (executor, size):
+		yield from window(executor, _table_file, jobs, size)
+
+def prime(paths, workers:int=None, encoding='utf-8', cache=shared):
+	"""
+	# Delineate the sources at &paths with &parse_files and remember their tables in &cache
+	# so that subsequent &Cache.parse and &Cache.table calls do not delineate them.
+	"""
+	count = 0
+	for path, key, data in parse_files(paths, workers=workers, encoding=encoding):
+		cache.remember(key, AreaTable.load(data))
+		count += 1
+
+	return count
+
 if __name__ == '__main__':
 	import sys
 	src, = sys.argv[1:]
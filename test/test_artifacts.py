@@ -0,0 +1,127 @@
+import os
+import tempfile
+from .. import artifacts as module
+from .. import cache
+
+def test_key(test):
+	"""
+	# Check that the parameters influencing the output are part of the key.
+	"""
+	k = module.key('digest', 'ast', '/m.py', 'utf-8', 'factor', 'debug', 1)
+	test/k == module.key('digest', 'ast', '/m.py', 'utf-8', 'factor', 'debug', 1)
+	test/k != module.key('other', 'ast', '/m.py', 'utf-8', 'factor', 'debug', 1)
+	test/k != module.key('digest', 'bytecode', '/m.py', 'utf-8', 'factor', 'debug', 1)
+	test/k != module.key('digest', 'ast', '/n.py', 'utf-8', 'factor', 'debug', 1)
+	test/k != module.key('digest', 'ast', '/m.py', 'latin-1', 'factor', 'debug', 1)
+	test/k != module.key('digest', 'ast', '/m.py', 'utf-8', 'factor', 'coverage', 1)
+	test/k != module.key('digest', 'ast', '/m.py', 'utf-8', 'factor', 'debug', 2)
+
+def test_materialize(test):
+	"""
+	# Check that stored artifacts replace targets and are not altered by
+	# later writes to the target.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		with cache.redirect(os.path.join(d, 'cache')):
+			k = module.key('digest', 'ast', '/m.py', 'utf-8', None, None, 0)
+			target = os.path.join(d, 'unit')
+			test/module.materialize(k, target) == False
+			test/os.path.exists(target) == False
+
+			with open(target, 'wb') as f:
+				f.write(b'artifact')
+			test/module.store(k, target) == True
+
+			# Stored by copy.
+			with open(target, 'wb') as f:
+				f.write(b'modified')
+
+			test/module.materialize(k, target) == True
+			with open(target, 'rb') as f:
+				test/f.read() == b'artifact'
+
+			# Use is recorded by the access time of the entry alone so
+			# that the targets sharing the entry keep their modification time.
+			entry = cache.path(module.namespace, k)
+			os.utime(entry, ns=(0, 10**9))
+			other = os.path.join(d, 'other')
+			test/module.materialize(k, other) == True
+			test/os.stat(entry).st_mtime_ns == 10**9
+			test/os.stat(entry).st_atime_ns > 10**9
+
+def test_write(test):
+	"""
+	# Check that writes replace the target and that identical data is not written.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		target = os.path.join(d, 'unit')
+		test/module.write(target, b'data') == True
+		os.utime(target, (0, 0))
+		ino = os.stat(target).st_ino
+
+		test/module.write(target, b'data') == False
+		test/os.stat(target).st_mtime == 0
+		test/os.stat(target).st_ino == ino
+
+		# Replaced rather than modified in place.
+		link = os.path.join(d, 'link')
+		os.link(target, link)
+		test/module.write(target, b'other') == True
+		with open(link, 'rb') as f:
+			test/f.read() == b'data'
+		with open(target, 'rb') as f:
+			test/f.read() == b'other'
+		test/sorted(os.listdir(d)) == ['link', 'unit']
+
+def test_replicate(test):
+	"""
+	# Check that replicas match the origin and that unchanged files are not copied.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		origin = os.path.join(d, 'origin')
+		target = os.path.join(d, 'target')
+		os.makedirs(os.path.join(origin, 'sub', 'deeper'))
+		for x in ['a', 'sub/b', 'sub/deeper/c']:
+			with open(os.path.join(origin, x), 'w') as f:
+				f.write(x)
+		os.symlink('a', os.path.join(origin, 'l'))
+
+		def contents(root):
+			r = {}
+			for parent, dirs, files in os.walk(root):
+				for x in files:
+					p = os.path.join(parent, x)
+					with open(p) as f:
+						r[os.path.relpath(p, root)] = f.read()
+			return r
+
+		test/module.replicate(origin, target, link=False) == 3
+		test/contents(target) == contents(origin)
+		test/os.readlink(os.path.join(target, 'l')) == 'a'
+
+		# Unchanged.
+		test/module.replicate(origin, target, link=False, workers=0) == 0
+
+		# Modified, removed, and extraneous entries.
+		with open(os.path.join(origin, 'sub/b'), 'w') as f:
+			f.write('modified')
+		os.unlink(os.path.join(origin, 'sub/deeper/c'))
+		with open(os.path.join(target, 'extra'), 'w') as f:
+			f.write('extra')
+		test/module.replicate(origin, target) == 1
+		test/contents(target) == contents(origin)
+
+		# Replicated files are not copied again.
+		test/module.replicate(origin, target) == 0
+
+		# Copied by default; writes to the origin do not reach the replica.
+		with open(os.path.join(origin, 'a'), 'w') as f:
+			f.write('written')
+		test/contents(target)['a'] == 'a'
+
+		test/module.replicate(origin, target, link=True) == 1
+		test/contents(target) == contents(origin)
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
@@ -0,0 +1,81 @@
+import os
+import sys
+import tempfile
+from .. import bundle as module
+from .. import bytecode
+
+def _code(source, name):
+	return compile(source, '<' + name + '>', 'exec')
+
+def test_Finder_lookup(test):
+	"""
+	# Check that entries are located by name regardless of the order they were added in.
+	"""
+	names = ['pkg.' + str(i) for i in range(50)] + ['pkg', 'a', 'z.y']
+
+	with tempfile.TemporaryDirectory() as d:
+		path = os.path.join(d, 'b')
+		test/bytecode.bundle(path, [(x, _code('n = %r' % x, x), x == 'pkg') for x in names]) == len(names)
+
+		f = module.Finder.open(path)
+		test/list(f.names()) == sorted(names)
+		test/f.find_spec('absent') == None
+		test/f.find_spec('pkg.50') == None
+
+		for x in names:
+			ns = {}
+			exec(f.get_code(x), ns)
+			test/ns['n'] == x
+			test/f.is_package(x) == (x == 'pkg')
+
+		test/ImportError ^ (lambda: f.get_code('absent'))
+
+def test_Finder_invalid(test):
+	"""
+	# Check that files other than bundles are rejected.
+	"""
+	test/ValueError ^ (lambda: module.Finder(b'\x00' * 32))
+
+	with tempfile.TemporaryDirectory() as d:
+		path = os.path.join(d, 'b')
+		bytecode.bundle(path, [])
+		with open(path, 'rb') as f:
+			data = bytearray(f.read())
+		test/module.Finder(bytes(data)).count == 0
+
+		data[12:16] = b'\x00\x00\x00\x00'
+		test/ValueError ^ (lambda: module.Finder(bytes(data)))
+
+def test_install(test):
+	"""
+	# Check that modules and packages are imported from an installed bundle.
+	"""
+	prefix = '_fault_bundle_test'
+	modules = [
+		(prefix, _code('level = 0', prefix), True),
+		(prefix + '.sub', _code('from . import leaf\nlevel = leaf.level - 1', 'sub'), True),
+		(prefix + '.sub.leaf', _code('level = 2', 'leaf'), False),
+	]
+
+	with tempfile.TemporaryDirectory() as d:
+		path = os.path.join(d, 'b')
+		bytecode.bundle(path, modules)
+
+		f = module.install(path)
+		try:
+			import importlib
+			m = importlib.import_module(prefix + '.sub')
+			test/m.level == 1
+			test/m.leaf.level == 2
+			test/m.__spec__.loader == f
+			test/m.__file__ == '<sub>'
+			test/m.leaf.__file__ == '<leaf>'
+			test/sys.modules[prefix].level == 0
+		finally:
+			sys.meta_path.remove(f)
+			for x in [y for y in sys.modules if y.startswith(prefix)]:
+				del sys.modules[x]
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
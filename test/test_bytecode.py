@@ -0,0 +1,67 @@
+import os
+import sys
+import marshal
+import tempfile
+import importlib
+import importlib.util
+from .. import bytecode as module
+
+def _import(directory, name):
+	sys.path.insert(0, directory)
+	try:
+		importlib.invalidate_caches()
+		return importlib.import_module(name)
+	finally:
+		del sys.path[0]
+		sys.modules.pop(name, None)
+
+def _store(check, directory, name, value, source=None):
+	# Store bytecode for the module, &name, assigning &value instead of the source's.
+	path = os.path.join(directory, name + '.py')
+	co = compile("value = %r\n" %(value,), path, 'exec')
+	target = importlib.util.cache_from_source(path)
+	os.makedirs(os.path.dirname(target), exist_ok=True)
+
+	with open(path, 'rb') as f:
+		data = f.read()
+		module.store(check, target, co, f.fileno(), data if source is None else source)
+
+	return target
+
+def test_store_raw(test):
+	"""
+	# Check that raw stores are marshalled code objects.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		co = compile("value = 1\n", 'raw.py', 'exec')
+		target = os.path.join(d, 'raw.pyc')
+		module.store('raw', target, co, -1, None)
+
+		with open(target, 'rb') as f:
+			test/marshal.load(f) == co
+
+		test/ValueError ^ (lambda: module.store('unknown', target, co, -1, None))
+
+def test_store_headers(test):
+	"""
+	# Check that the importer accepts the stored bytecode.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		for i, check in enumerate(['time', 'hash', 'never']):
+			name = 'stored_' + check
+			with open(os.path.join(d, name + '.py'), 'w') as f:
+				f.write("value = 'source'\n")
+
+			_store(check, d, name, i)
+			test/_import(d, name).value == i
+
+		# Checked hashes of different sources are rejected; unchecked are not.
+		_store('hash', d, 'stored_hash', 'stale', source=b'other')
+		test/_import(d, 'stored_hash').value == 'source'
+
+		_store('never', d, 'stored_never', 'unchecked', source=b'other')
+		test/_import(d, 'stored_never').value == 'unchecked'
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
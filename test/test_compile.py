@@ -0,0 +1,262 @@
+import io
+import os
+import json
+import tempfile
+import contextlib
+from ..bin import compile as module
+from .. import artifacts
+from .. import cache
+
+@contextlib.contextmanager
+def isolated():
+	# Temporary directory holding a source with the cache directed into it.
+	with tempfile.TemporaryDirectory() as d, cache.redirect(os.path.join(d, 'cache')):
+		module._fingerprints = None
+
+		src = os.path.join(d, 'm.py')
+		with open(src, 'w') as f:
+			f.write('"doc"\ndef f():\n\treturn 1\n')
+
+		try:
+			yield d, src
+		finally:
+			module._fingerprints = None
+
+def test_unit_key(test):
+	"""
+	# Check that the key identifies the source content and the parameters of the unit.
+	"""
+	with isolated() as (d, src):
+		k = module.unit_key('ast-code', src, 'm', 'debug', 1)
+		test/k == module.unit_key('ast-code', src, 'm', 'debug', 1)
+		test/k != module.unit_key('bytecode-raw', src, 'm', 'debug', 1)
+		test/k != module.unit_key('ast-code', src, 'm', 'optimal', 1)
+		test/k != module.unit_key('ast-code', src, 'm', 'debug', 2)
+
+		with open(src, 'a') as f:
+			f.write('x = 1\n')
+		changed = module.unit_key('ast-code', src, 'm', 'debug', 1)
+		test/k != changed
+
+		# Batches identify the sources using the index.
+		test/module._fingerprints == None
+		module.index()
+		test/module.unit_key('ast-code', src, 'm', 'debug', 1) == changed
+
+def test_cached(test):
+	"""
+	# Check that builds are only performed when the artifact is not stored.
+	"""
+	with isolated() as (d, src):
+		target = os.path.join(d, 'unit')
+		builds = []
+		def build():
+			builds.append(target)
+			artifacts.write(target, b'artifact')
+
+		k = module.unit_key('ast-code', src, 'm', 'debug', 1)
+		module.cached(k, target, build)
+		test/len(builds) == 1
+
+		os.unlink(target)
+		module.cached(k, target, build)
+		test/len(builds) == 1
+		with open(target, 'rb') as f:
+			test/f.read() == b'artifact'
+
+def test_execute_cached(test):
+	"""
+	# Check that units are restored from the cache only when the intention
+	# and optimization level match.
+	"""
+	with isolated() as (d, src):
+		unit = os.path.join(d, 'm.unit')
+		builds = []
+		mkast = module.mkast
+		def counted(*args):
+			builds.append(args)
+			return mkast(*args)
+
+		module.mkast = counted
+		try:
+			module.execute(unit, src, {'intention': 'debug', 'factor': 'm'})
+			test/len(builds) == 1
+			with open(unit, 'rb') as f:
+				debug = f.read()
+
+			os.unlink(unit)
+			module.execute(unit, src, {'intention': 'debug', 'factor': 'm'})
+			test/len(builds) == 1
+			with open(unit, 'rb') as f:
+				test/f.read() == debug
+
+			module.execute(unit, src, {'intention': 'optimal', 'factor': 'm'})
+			test/len(builds) == 2
+			module.execute(unit, src, {'intention': 'debug', 'factor': 'm', 'cpython-optimize': '2'})
+			test/len(builds) == 3
+			module.execute(unit, src, {'intention': 'debug', 'factor': 'm', 'cpython-optimize': '2'})
+			test/len(builds) == 3
+		finally:
+			module.mkast = mkast
+
+def test_execute_areas(test):
+	"""
+	# Check that instrumented units recording areas are always built
+	# so that the area tables are recorded.
+	"""
+	from .. import instrumentation
+	from ..module import hash_syntax
+
+	with isolated() as (d, src):
+		unit = os.path.join(d, 'm.unit')
+		params = {'intention': 'coverage', 'factor': 'm', 'areas': 'true'}
+		with open(src) as f:
+			digest = hash_syntax(f.read())
+
+		module.execute(unit, src, params)
+		test/(instrumentation.load_areas(digest) is not None) == True
+
+		os.unlink(cache.path('areas', instrumentation.area_key(digest)))
+		module.execute(unit, src, params)
+		test/(instrumentation.load_areas(digest) is not None) == True
+
+def test_execute_time(test):
+	"""
+	# Check that time checked bytecode is not restored from the cache when
+	# combined with the parameters extending the kind of the unit.
+	"""
+	import struct
+	with isolated() as (d, src):
+		unit = os.path.join(d, 'm.unit')
+		pyc = os.path.join(d, 'm.pyc')
+		module.execute(unit, src, {'factor': 'm'})
+
+		params = {'factor': 'm', 'format': 'python.ast', 'check': 'time', 'columns': 'false'}
+		mtimes = []
+		for mtime in (1000, 2000):
+			os.utime(src, (mtime, mtime))
+			module.execute(pyc, unit, params)
+			with open(pyc, 'rb') as f:
+				mtimes.append(struct.unpack('<4xII', f.read(12))[1])
+
+		test/mtimes == [1000, 2000]
+
+def test_execute_optimize(test):
+	"""
+	# Check that units holding code compiled at another level are compiled
+	# again from their origin.
+	"""
+	import marshal
+	with isolated() as (d, src):
+		unit = os.path.join(d, 'm.unit')
+		pyc = os.path.join(d, 'm.pyc')
+
+		for intention in ('debug', 'coverage'):
+			module.execute(unit, src, {'intention': intention, 'factor': 'm', 'cpython-optimize': '1'})
+			module.execute(pyc, unit, {
+				'intention': intention,
+				'factor': 'm',
+				'format': 'python.ast',
+				'cpython-optimize': '2',
+			})
+
+		module.execute(unit, src, {'intention': 'debug', 'factor': 'm', 'cpython-optimize': '1'})
+		module.execute(pyc, unit, {'factor': 'm', 'format': 'python.ast', 'cpython-optimize': '2'})
+		with open(pyc, 'rb') as f:
+			ns = {}
+			exec(marshal.loads(f.read()), ns)
+		test/ns.get('__doc__') == None
+		test/ns['f']() == 1
+
+def test_serve(test):
+	"""
+	# Check that a status line is written for each job record in order.
+	"""
+	with isolated() as (d, src):
+		unit = os.path.join(d, 'm.unit')
+		pyc = os.path.join(d, 'm.pyc')
+		records = [
+			{'id': 'unit', 'output': unit, 'source': src, 'parameters': ['intention', 'debug', 'factor', 'm']},
+			{'output': pyc, 'source': unit, 'parameters': {'format': 'python.ast', 'factor': 'm'}},
+		]
+		input = io.StringIO(''.join(json.dumps(x) + '\n' for x in records))
+		output = io.StringIO()
+
+		test/module.serve(input, output) == True
+		statuses = [json.loads(x) for x in output.getvalue().splitlines()]
+		test/statuses == [
+			{'job': 'unit', 'status': 'complete'},
+			{'job': 1, 'status': 'complete'},
+		]
+		test/os.path.exists(pyc) == True
+
+def test_serve_pool(test):
+	"""
+	# Check that the status lines of pooled jobs are written in order and that
+	# jobs depending on the output of earlier jobs complete.
+	"""
+	with isolated() as (d, src):
+		records = []
+		for i in range(3):
+			unit = os.path.join(d, 'm%d.unit' %(i,))
+			pyc = os.path.join(d, 'm%d.pyc' %(i,))
+			records.append({'output': unit, 'source': src, 'parameters': {'factor': 'm'}})
+			records.append({'output': pyc, 'source': unit, 'parameters': {'format': 'python.ast', 'factor': 'm'}})
+
+		input = io.StringIO(''.join(json.dumps(x) + '\n' for x in records))
+		output = io.StringIO()
+		test/module.serve(input, output, workers=2) == True
+
+		statuses = [json.loads(x) for x in output.getvalue().splitlines()]
+		test/[x['job'] for x in statuses] == list(range(6))
+		test/[x['status'] for x in statuses] == ['complete'] * 6
+
+def test_serve_errors(test):
+	"""
+	# Check that failed jobs and invalid records are reported and that
+	# a `shutdown` record stops the service.
+	"""
+	with isolated() as (d, src):
+		missing = os.path.join(d, 'missing.py')
+		records = [
+			json.dumps({'id': 'missing', 'output': os.path.join(d, 'unit'), 'source': missing}),
+			'[]',
+			'{',
+			json.dumps({'shutdown': True}),
+			json.dumps({'id': 'ignored', 'output': os.path.join(d, 'unit'), 'source': src}),
+		]
+		output = io.StringIO()
+
+		test/module.serve(io.StringIO('\n'.join(records) + '\n'), output) == False
+		statuses = [json.loads(x) for x in output.getvalue().splitlines()]
+		test/len(statuses) == 3
+		test/[x['job'] for x in statuses] == ['missing', 1, 2]
+		test/[x['status'] for x in statuses] == ['failed'] * 3
+		test/statuses[0]['error'].startswith('FileNotFoundError: ') == True
+		test/statuses[1]['error'] == 'ValueError: job record is not an object'
+		test/statuses[2]['error'].startswith('ValueError: ') == True
+
+def test_modules(test):
+	"""
+	# Check that only bytecode files are identified and that modules
+	# identified by more than one file are rejected.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		os.makedirs(os.path.join(d, 'pkg'))
+		for x in ['__init__.pyc', 'm.pyc', 'pkg/__init__.pyc', 'pkg/a.pyc', 'pkg/notes.txt']:
+			with open(os.path.join(d, x), 'wb') as f:
+				f.write(b'')
+
+		test/[x[0::2] for x in module.modules(d)] == [
+			('m', False),
+			('pkg', True),
+			('pkg.a', False),
+		]
+
+		with open(os.path.join(d, 'pkg', 'a.opt-1.pyc'), 'wb') as f:
+			f.write(b'')
+		test/ValueError ^ (lambda: list(module.modules(d)))
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
@@ -0,0 +1,110 @@
+import io
+import collections
+from .. import counters as module
+
+sample = {
+	'/src/m.py': collections.Counter({
+		(1, 1, 1, 10): 3,
+		(2, 5, 4, 1): 1,
+	}),
+	'/src/pkg/__init__.py': collections.Counter({
+		(10, 1, 10, 2): 2**40,
+	}),
+}
+
+def test_store_load(test):
+	"""
+	# Validate that stored counters are loaded as they were written.
+	"""
+	f = io.BytesIO()
+	module.store(f, sample)
+
+	r = module.Reader(f.getvalue())
+	test/r.items() == sample
+
+def test_Writer_frames(test):
+	"""
+	# Check that frames emitted at the record limit and appended
+	# frames are summed by the reader.
+	"""
+	f = io.BytesIO()
+	with module.Writer(f, limit=2) as w:
+		for path, counts in sample.items():
+			w.extend(path, counts.items())
+	with module.Writer(f) as w:
+		w.write('/src/m.py', (1, 1, 1, 10), 4)
+
+	r = module.Reader(f.getvalue())
+	test/len(list(r.frames())) == 3
+
+	data = r.items()
+	test/data['/src/m.py'][(1, 1, 1, 10)] == 7
+	test/data['/src/pkg/__init__.py'] == sample['/src/pkg/__init__.py']
+
+def test_Reader_empty(test):
+	"""
+	# Empty files contain no frames.
+	"""
+	r = module.Reader(b'')
+	test/list(r.frames()) == []
+	test/dict(r.items()) == {}
+
+def test_Reader_invalid(test):
+	"""
+	# Files not starting with the magic bytes are rejected.
+	"""
+	test/ValueError ^ (lambda: module.Reader(b'\x00' * 16))
+
+def test_Reader_truncated(test):
+	"""
+	# Check that an incompletely written trailing frame is ignored.
+	"""
+	f = io.BytesIO()
+	module.store(f, sample)
+	complete = f.getvalue()
+	with module.Writer(f) as w:
+		w.write('/src/m.py', (1, 1, 1, 10), 4)
+	data = f.getvalue()
+
+	for size in range(len(complete), len(data)):
+		r = module.Reader(data[:size])
+		test/r.items() == sample
+
+	test/module.Reader(data).items()['/src/m.py'][(1, 1, 1, 10)] == 7
+
+def test_difference(test):
+	"""
+	# Check that only the counts accumulated after the snapshot are produced.
+	"""
+	store = collections.Counter({('m.py', (1, 1, 1, 2)): 2, ('m.py', (2, 1, 2, 2)): 1})
+	s = module.snapshot(store)
+	store.update({('m.py', (1, 1, 1, 2)): 3, ('n.py', (1, 1, 1, 2)): 1})
+
+	test/dict(module.difference(store, s)) == {
+		('m.py', (1, 1, 1, 2)): 3,
+		('n.py', (1, 1, 1, 2)): 1,
+	}
+	test/dict(module.difference(store, module.snapshot(store))) == {}
+
+def test_Index(test):
+	"""
+	# Validate test selection by line range and the serialized form.
+	"""
+	i = module.Index()
+	i.add('test_a', [('m.py', (1, 1, 2, 5)), ('m.py', (10, 1, 10, 5))])
+	i.add('test_b', [('m.py', (10, 1, 10, 5)), ('n.py', (3, 1, 3, 2))])
+
+	test/i.select('m.py', 1, 2) == {'test_a'}
+	test/i.select('m.py', 5) == {'test_a', 'test_b'}
+	test/i.select('m.py', 3, 9) == set()
+	test/i.select('n.py') == {'test_b'}
+	test/i.select('o.py') == set()
+
+	l = module.Index.load(i.serialize())
+	test/l.tests == i.tests
+	test/l.select('m.py', 10, 10) == {'test_a', 'test_b'}
+	test/l.select('n.py') == {'test_b'}
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
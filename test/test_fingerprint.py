@@ -0,0 +1,55 @@
+import os
+import hashlib
+import tempfile
+from .. import fingerprint as module
+from .. import cache
+
+def test_digest(test):
+	"""
+	# Check that digests are of the file's bytes.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		p = os.path.join(d, 'f')
+		with open(p, 'wb') as f:
+			f.write(b'data')
+		test/module.digest(p) == hashlib.blake2b(b'data').hexdigest()
+		test/module.digest(p, 'sha256') == hashlib.sha256(b'data').hexdigest()
+
+		with open(p, 'wb') as f:
+			pass
+		test/module.digest(p) == hashlib.blake2b(b'').hexdigest()
+
+def test_Index(test):
+	"""
+	# Check that digests are noted by status and stored across instances.
+	"""
+	with tempfile.TemporaryDirectory() as d:
+		with cache.redirect(os.path.join(d, 'cache')):
+			p = os.path.join(d, 'f')
+			with open(p, 'wb') as f:
+				f.write(b'data')
+			os.utime(p, (0, 0))
+
+			with module.Index() as idx:
+				test/idx.fingerprint(p) == module.digest(p)
+
+			# Noted digests are not recomputed while the status is unchanged.
+			idx = module.Index()
+			idx.load()
+			key = module.status(os.stat(p))
+			idx._digests[key] = 'noted'
+			test/idx.fingerprint(p) == 'noted'
+
+			idx = module.Index()
+			test/idx.fingerprint(p) == module.digest(p)
+
+			# Recently modified files are not noted.
+			with open(p, 'wb') as f:
+				f.write(b'changed')
+			with module.Index() as idx:
+				test/idx.fingerprint(p) == module.digest(p)
+			test/(module.status(os.stat(p)) in cache.load('fingerprints', 'index-blake2b')) == False
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
@@ -0,0 +1,63 @@
+import ast
+import builtins
+from .. import instrumentation as module
+from .. import source
+from ..module import hash_syntax
+
+def test_compile(test):
+	"""
+	# Check that instrumented trees are accepted by the compiler and that
+	# the synthetic addresses of the counters do not leak into other trees.
+	"""
+	src = "x = a or (b or [1, 2])\nif x:\n\tpass\n"
+	tree = module.compile('f', src, 'sample.py', [], parse=source.Cache().parse)
+	co = builtins.compile(tree, 'sample.py', 'exec')
+	test/isinstance(co, type(compile('', '', 'exec'))) == True
+
+	# Expression contexts are shared by trees; their addresses must not be set.
+	test/hasattr(ast.parse("z").body[0].value.ctx, 'lineno') == False
+	lines, other, nodes = source.parse("y = z\n", "other.py")
+	areas = [x[0]._f_area for x in nodes if hasattr(x[0], '_f_area')]
+	test/min(min(x) for x in areas) >= 0
+
+def test_compile_store(test):
+	"""
+	# Check that areas are only recorded when a store is given and that the
+	# digest of the parse key identifies them.
+	"""
+	src = "x = f(1)\n"
+	c = source.Cache()
+	recorded = []
+	module.compile('f', src, 'sample.py', [], parse=c.parse)
+	test/recorded == []
+
+	module.compile('f', src, 'sample.py', [], parse=c.parse, store=(lambda *x: recorded.append(x)))
+	digest = hash_syntax(src)
+	test/recorded[0][0] == digest
+	test/(c.lookup(c.key(src, digest)) is not None) == True
+
+def test_store_areas(test):
+	"""
+	# Check that recorded tables are loaded and that the namespace is pruned.
+	"""
+	import os, tempfile
+	from .. import cache
+
+	frequency, limit = module.area_prune_frequency, module.area_limit
+	with tempfile.TemporaryDirectory() as d, cache.redirect(d):
+		module.area_prune_frequency = 1
+		module.area_limit = 1024*1024
+		try:
+			table = [((1, 1, 1, 5), 'Call')]
+			test/module.store_areas('digest', table) == True
+			test/module.load_areas('digest') == table
+
+			module.area_limit = 0
+			module.store_areas('other', table)
+			test/module.load_areas('digest') == None
+		finally:
+			module.area_prune_frequency, module.area_limit = frequency, limit
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
@@ -0,0 +1,110 @@
+import sys
+import ast
+from .. import module
+
+sample = "import os\n\n@d\ndef f(x, *a, y=1, **k):\n\treturn {**k, 'x': [x, *a]}[y]\n\nclass C(object):\n\tz = f'{os.sep!r}'\n"
+
+def test_hash_syntax(test):
+	"""
+	# Check that the digest is the digest of the encoded source regardless of
+	# the number of chunks that it is encoded in.
+	"""
+	import hashlib
+	for text in ["", "x = 1\n", "s = '\u00e9\u20ac'\n" * 2000]:
+		expected = hashlib.sha3_256(text.encode('utf-8')).hexdigest()
+		test/module.hash_syntax(text) == expected
+		test/module.hash_syntax(text, hash_chunks=7) == expected
+
+	# Sources within a single chunk keep the digest of the previous implementation.
+	test/module.hash_syntax("x = 1\n") == 'c1d053c902878b4ca285f50589bf8d8f097f6927ede52731b2029bd2397a79d4'
+
+def test_unit_tree(test):
+	"""
+	# Check that trees are reconstructed by &module.load_unit.
+	"""
+	tree = module.compile('factor', sample, 'sample.py', [])
+	data = module.dump_unit('sample.py', tree)
+	origin, restored = module.load_unit(data)
+
+	test/origin == 'sample.py'
+	test/ast.dump(restored, include_attributes=True) == ast.dump(tree, include_attributes=True)
+	test/compile(restored, origin, 'exec') == compile(tree, origin, 'exec')
+	test/module.load_unit_code(data, 1) == None
+
+	# Shared context nodes are stored once.
+	contexts = set(id(x.ctx) for x in ast.walk(restored) if isinstance(x, ast.Name))
+	test/len(contexts) == len(set(id(x.ctx) for x in ast.walk(tree) if isinstance(x, ast.Name)))
+
+def test_unit_code(test):
+	"""
+	# Check that units holding code are selected by optimize level.
+	"""
+	tree = module.compile('factor', sample, 'sample.py', [])
+	co = compile(tree, 'sample.py', 'exec', optimize=1)
+	data = module.dump_unit('sample.py', code=co, optimize=1)
+
+	test/module.load_unit_code(data, 1) == ('sample.py', co)
+	test/module.load_unit_code(data, 2) == None
+	test/ValueError ^ (lambda: module.load_unit(data))
+	test/module.load_unit_origin(data) == 'sample.py'
+
+def test_unit_invalid(test):
+	"""
+	# Check that foreign data and other versions are rejected.
+	"""
+	import marshal
+	test/ValueError ^ (lambda: module.load_unit(b'\x80\x04data'))
+
+	data = module.unit_magic + marshal.dumps((module.unit_version + 1, sys.version_info[:2]))
+	test/ValueError ^ (lambda: module.load_unit(data))
+
+def test_unit_depth(test):
+	"""
+	# Check that deeply nested trees are serialized without recursion.
+	"""
+	tree = ast.parse("x = " + " + ".join(["a"] * (sys.getrecursionlimit() // 2)) + "\n")
+	origin, restored = module.load_unit(module.dump_unit('deep.py', tree))
+	test/len(list(ast.walk(restored))) == len(list(ast.walk(tree)))
+
+def test_strip_docstrings(test):
+	"""
+	# Check that docstrings are removed and that emptied bodies remain valid.
+	"""
+	src = '"m"\ndef f():\n\t"d"\nclass C:\n\t"c"\n\tx = "s"\nv = 1\n'
+	ns = {}
+	exec(compile(module.strip_docstrings(ast.parse(src)), 'm', 'exec'), ns)
+	test/ns.get('__doc__') == None
+	test/ns['f'].__doc__ == None
+	test/ns['f']() == None
+	test/ns['C'].__doc__ == None
+	test/ns['C'].x == 's'
+	test/ns['v'] == 1
+
+def test_strip_columns(test):
+	"""
+	# Check that line numbers are retained while columns are removed.
+	"""
+	if sys.version_info < (3, 11):
+		return
+
+	src = 'x = 1\nif x:\n\ty = [\n\t\tz\n\t\tfor z in range(3)]\n' + ('\n' * 200) + 'w = -1\n'
+	co = compile(src, 'm', 'exec')
+	stripped = module.strip_columns(co)
+
+	def lines(c):
+		yield [x[0] for x in c.co_positions()]
+		for k in c.co_consts:
+			if isinstance(k, c.__class__):
+				yield from lines(k)
+
+	test/list(lines(stripped)) == list(lines(co))
+	test/set(x[2] for x in stripped.co_positions()) == {None}
+	test/len(stripped.co_linetable) < len(co.co_linetable)
+
+	ns = {}
+	exec(stripped, ns)
+	test/ns['y'] == [0, 1, 2]
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])
@@ -0,0 +1,265 @@
+import ast
+from .. import source as module
+
+sample = "\n".join([
+	"import os",
+	"def f(a, b=1, *c):",
+	"\tx = os.path.join(a, 'b')",
+	"\treturn [i for i in c if i] or x",
+	"",
+])
+
+def areas(nodes):
+	return {
+		(x[0].__class__.__name__, getattr(x[0], 'lineno', None)): x[0]._f_area
+		for x in nodes if hasattr(x[0], '_f_area')
+	}
+
+def test_parse_positions(test):
+	"""
+	# Check the areas derived from the end positions of the nodes.
+	"""
+	lines, tree, nodes = module.parse(sample, "sample.py")
+	a = areas(nodes)
+
+	test/lines[0] == b"import os\n"
+	test/a[('Import', 1)] == (1, 0, 1, 9)
+	test/a[('FunctionDef', 2)] == (2, 0, 4, 32)
+	test/a[('Assign', 3)] == (3, 1, 3, 25)
+	test/a[('BoolOp', 4)] == (4, 8, 4, 32)
+
+	# Located by the extent of the arguments.
+	test/a[('arguments', None)] == (2, 6, 2, 16)
+
+def test_parse_chain_context(test):
+	"""
+	# Nodes sharing a start address are associated with a common context.
+	"""
+	lines, tree, nodes = module.parse("os.path.join(a)\n", "sample.py")
+	list(nodes)
+	call = tree.body[0].value
+
+	test/call._f_area == (1, 0, 1, 15)
+	test/call._f_context[0] == (1, 0, 1, 2)
+	test/call._f_context[call._f_index] == call._f_area
+
+def test_parse_tokens(test):
+	"""
+	# Check that the token walker is still available.
+	"""
+	lines, tree, nodes = module.parse(sample, "sample.py", positions=False)
+	a = areas(nodes)
+
+	test/a[('Import', 1)] == (1, 0, 1, 9)
+	test/a[('Assign', 3)] == (3, 1, 3, 25)
+
+def test_parse_once(test):
+	"""
+	# Validate that nodes produced more than once by the filter are delineated once.
+	"""
+	def twice(tree):
+		for x in module.bottom(tree):
+			yield x
+			yield x
+
+	lines, tree, nodes = module.parse("x = a or (b or [1, 2])\n", "sample.py", filter=twice)
+	produced = [x[0] for x in nodes if hasattr(x[0], '_f_area')]
+	test/len(produced) == len(set(map(id, produced)))
+	test/len([x for x in produced if isinstance(x, ast.BoolOp)]) == 2
+
+def test_Cache(test):
+	"""
+	# Check that cached area tables reproduce the delineated areas.
+	"""
+	c = module.Cache(size=1)
+	expected = areas(module.parse(sample, "sample.py")[2])
+
+	test/c.lookup(c.key(sample)) == None
+	test/areas(c.parse(sample, "sample.py")[2]) == expected
+	test/(c.lookup(c.key(sample)) is not None) == True
+
+	# Restored from the table.
+	test/areas(c.parse(sample, "sample.py")[2]) == expected
+
+	# Evicted by another source.
+	c.parse("x = 1\n", "other.py")
+	test/c.lookup(c.key(sample)) == None
+
+	# Remembered without parsing.
+	table = c.lookup(c.key("x = 1\n"))
+	c.remember(c.key(sample), table)
+	test/(c.lookup(c.key(sample)) is table) == True
+
+def test_AreaTable(test):
+	"""
+	# Validate the accessors and that contexts are restored by identity.
+	"""
+	lines, tree, nodes = module.parse("os.path.join(a)\n", "sample.py")
+	list(nodes)
+	table = module.AreaTable.from_tree(tree)
+	table = module.AreaTable.load(table.serialize())
+
+	test/table.tree == None
+	table = table.bind(tree)
+	test/(table.tree is tree) == True
+	call = table.select(tree.body[0].value)
+	name = table.select(tree.body[0].value.args[0])
+	test/table.area(call) == (1, 0, 1, 15)
+	test/table.area(name) == (1, 13, 1, 14)
+	test/table.members(name) == None
+	test/table.delineate(table.select(tree.body[0].value.func)) == (1, 0, 1, 12)
+	test/table.area(table.select(tree)) == None
+
+	lines, restored, nodes = module.parse("os.path.join(a)\n", "sample.py", filter=(lambda x: ()))
+	table.apply(restored)
+	call = restored.body[0].value
+	attr = call.func
+
+	test/call._f_area == (1, 0, 1, 15)
+	test/call._f_index == 3
+	test/(call._f_context is attr._f_context) == True
+
+	module.detach(restored)
+	test/hasattr(call, '_f_area') == False
+
+def test_associate_siblings_depth(test):
+	"""
+	# Check that deeply nested expressions do not exhaust the recursion limit.
+	"""
+	import sys
+	depth = sys.getrecursionlimit() * 2
+	deep = "x = " + " + ".join(["a"] * depth) + "\n"
+
+	for positions in (True, False):
+		lines, tree, nodes = module.parse(deep, "deep.py", positions=positions)
+		located = [x for x in nodes if hasattr(x[0], '_f_area')]
+		test/len(located) == (depth * 2) + 1
+
+def test_update(test):
+	"""
+	# Check that incremental updates match a complete delineation.
+	"""
+	import ast
+	base = "import os\n\ndef f(x):\n\treturn os.path.join(x)\n\n@d\ndef g():\n\tpass\n\ny = f(1)\n"
+	edits = [
+		base.replace("join(x)", "join(x, 'a')"),
+		base.replace("\tpass\n", "\tpass\n\tz = [1,\n\t\t2]\n"),
+		base.replace("\n@d\n", "\n# comment\n\n@d\n"),
+		base.replace("\ndef f(x):\n\treturn os.path.join(x)\n", ""),
+		base.replace("y = f(1)", "y = f((1"),
+	]
+
+	def signature(d):
+		return d.table().serialize(), ast.dump(d.tree, include_attributes=True)
+
+	for edited in edits:
+		try:
+			expected = signature(module.delineate(edited, "edit.py"))
+		except SyntaxError:
+			test/SyntaxError ^ (lambda: module.update(module.delineate(base, "edit.py"), edited, "edit.py"))
+			continue
+
+		updated = module.update(module.delineate(base, "edit.py"), edited, "edit.py")
+		test/signature(updated) == expected
+
+def test_TokenIndex(test):
+	"""
+	# Check that the index resolves the addresses of a token dictionary.
+	"""
+	import io, tokenize
+	text = 'x = """doc\nstring""" + f(1)\n'
+	tokens = list(tokenize.generate_tokens(io.StringIO(text).readline))
+
+	expected = {}
+	for i, t in enumerate(tokens):
+		expected.setdefault(t.start, i)
+		if t.type == tokenize.STRING:
+			expected[(t.end[0], -1)] = i
+			expected[(t.start[0], t.start[1]+1)] = i
+
+	idx = module.map_tokens(tokens)
+	for address, i in expected.items():
+		test/idx[address] == i
+	test/((1, 3) in idx) == False
+	test/KeyError ^ (lambda: idx[(9, 0)])
+
+def test_TokenWindow(test):
+	"""
+	# Check that windows narrow without copying the token list.
+	"""
+	tokens = list(range(10))
+	w = module.TokenWindow(tokens, 2, 8)
+	test/list(w) == [2, 3, 4, 5, 6, 7]
+	test/list(reversed(w)) == [7, 6, 5, 4, 3, 2]
+	test/w[-1] == 7
+
+	del w[:2]
+	del w[len(w)-1:]
+	test/list(w) == [4, 5, 6]
+	test/list(w[1:]) == [5, 6]
+	test/tokens == list(range(10))
+	test/IndexError ^ (lambda: w[3])
+	test/ValueError ^ (lambda: w.__delitem__(slice(1, 2)))
+
+def test_window(test):
+	"""
+	# Check that results are produced before reading the next item and
+	# that barriers wait for the calls before them.
+	"""
+	import threading
+	from concurrent import futures
+	consumed = threading.Event()
+	log = []
+
+	def items():
+		yield 1
+		# Blocks until the first result is produced.
+		test/consumed.wait(10) == True
+		yield 2
+		yield 3
+
+	def call(x):
+		log.append(('start', x))
+		if x == 2:
+			threading.Event().wait(0.2)
+		log.append(('end', x))
+		return x * 10
+
+	with futures.ThreadPoolExecutor(max_workers=4) as executor:
+		results = []
+		for r in module.window(executor, call, items(), 4, barrier=(lambda x: x == 3)):
+			results.append(r)
+			consumed.set()
+
+	test/results == [10, 20, 30]
+	test/log.index(('end', 2)) < log.index(('start', 3))
+
+	test/list(module.window(None, call, [4], 1)) == [40]
+
+def test_parse_files(test):
+	"""
+	# Check that batches produce the serialized tables in the order of the paths.
+	"""
+	import os, tempfile
+	with tempfile.TemporaryDirectory() as d:
+		paths = []
+		for i in range(4):
+			p = os.path.join(d, 'm%d.py' %(i,))
+			with open(p, 'w') as f:
+				f.write("x = f(%d)\n" %(i,) * (i+1))
+			paths.append(p)
+
+		serial = list(module.parse_files(paths, workers=0))
+		test/[x[0] for x in serial] == paths
+		test/len(module.AreaTable.load(serial[3][2]).columns[0]) > len(module.AreaTable.load(serial[0][2]).columns[0])
+
+		pooled = list(module.parse_files(paths, workers=2))
+		test/pooled == serial
+
+		c = module.Cache()
+		test/module.prime(paths, workers=0, cache=c) == 4
+		test/(c.lookup(serial[1][1]) is not None) == True
+
+if __name__ == '__main__':
+	from fault.test import engine as test; import sys
+	test.execute(sys.modules[__name__])